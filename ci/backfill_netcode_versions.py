@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+#
+# Fill the netcode version cache (_data/net_ver/<tag>.json) for release tags, by reading the netcode
+# version files directly from a local (bare) mirror of the game repository - instead of downloading
+# each release's source tarball
+#
+# Note: netplay_config.gen is generated at build / packaging time, so for tags where it is not committed
+# the older netplay.cpp definitions are used if present - any tags that cannot be resolved are reported
+# (and are left to the source tarball fall-back in generate_lobby_json.py)
+
+import sys
+import argparse
+import json
+import subprocess
+from datetime import datetime
+
+from generate_lobby_json import GitMirrorNetcodeVerResolver, NetcodeVer, get_netcode_ver_cache_file, write_netcode_ver_cache_file
+
+def get_mirror_tags(mirror_path: str) -> list:
+    output = subprocess.run(['git', '--git-dir', mirror_path, 'for-each-ref', 'refs/tags', '--format=%(refname:short)'], stdout=subprocess.PIPE, check=True).stdout
+    return [tag for tag in output.decode('utf-8').splitlines() if tag]
+
+def load_cached_netcode_ver(cache_file: str):
+    try:
+        with open(cache_file, 'r') as json_file:
+            data = json.load(json_file)
+            return NetcodeVer(data['NetcodeVer']['Major'], data['NetcodeVer']['Minor'])
+    except FileNotFoundError:
+        return None
+    except KeyError:
+        return None
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Fill the netcode version cache for release tags from a local git mirror')
+    parser.add_argument('gitmirror', type=str, help='path to a (bare) mirror of the game repository')
+    parser.add_argument('tags', type=str, nargs='*', help='tags to resolve (default: all tags in the mirror)')
+    parser.add_argument('-c', '--cache-dir', type=str, default='_data')
+    parser.add_argument('--overwrite', action='store_true', help='overwrite existing cache entries')
+    parser.add_argument('--verify', action='store_true', help='only compare the mirror against existing cache entries (nothing is written)')
+    args = parser.parse_args(argv)
+
+    tags = args.tags or get_mirror_tags(args.gitmirror)
+    print ('Resolving netcode versions for {0} tags from: {1}'.format(len(tags), args.gitmirror))
+
+    start = datetime.now()
+    resolver = GitMirrorNetcodeVerResolver(args.gitmirror)
+    try:
+        resolver.prefetch(tags)
+    finally:
+        resolver.close()
+    print ('Resolved in {0:.2f}s'.format((datetime.now() - start).total_seconds()))
+
+    unresolved = []
+    mismatched = []
+    written = 0
+    for tag in tags:
+        result = resolver.results.get(tag)
+        if result is None:
+            unresolved.append(tag)
+            continue
+        cache_file = get_netcode_ver_cache_file(tag, args.cache_dir)
+        cached = load_cached_netcode_ver(cache_file)
+        if args.verify:
+            if not cached is None and cached != result:
+                print('{0}: cached Major:{1} Minor:{2} != mirror Major:{3} Minor:{4}'.format(tag, cached.VerMajor, cached.VerMinor, result.VerMajor, result.VerMinor))
+                mismatched.append(tag)
+            continue
+        if cached is None or args.overwrite:
+            write_netcode_ver_cache_file(cache_file, result)
+            written += 1
+
+    if unresolved:
+        print ('Could not resolve ({0}): {1}'.format(len(unresolved), ' '.join(unresolved)))
+    if args.verify:
+        print ('{0} mismatched cache entries'.format(len(mismatched)))
+        if mismatched:
+            sys.exit(1)
+    else:
+        print ('Wrote {0} cache entries'.format(written))
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
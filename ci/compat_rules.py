@@ -0,0 +1,169 @@
+# Compile the declarative compat notice rules (see: compat_rules.json) into the
+# `propertyMatch` expressions used by the compatNotices in compat.json
+#
+# FIRST_LAUNCH date ranges are compiled into the minimal set of anchored prefix regexes,
+# which is then checked against a brute-force (day-by-day) evaluation of the range
+
+import json
+import re
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from string import Template
+
+# Rule "tag" values
+TAG_LATEST = 'latest'
+TAG_ANY = 'any'
+
+def parse_rule_date(date_string: str) -> date:
+    return datetime.strptime(date_string, '%Y-%m-%d').date()
+
+def _days_in_range(first: date, last: date):
+    day = first
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+def _year_mmdd_strings(year: int) -> list:
+    return [day.strftime('%m-%d') for day in _days_in_range(date(year, 1, 1), date(year, 12, 31))]
+
+def _maximal_prefixes(universe: list, selected: set, prefix: str = '') -> list:
+    # Find the shortest prefixes that match only (and all of) the selected strings in universe
+    candidates = [s for s in universe if s.startswith(prefix)]
+    if not candidates:
+        return []
+    matched = [s for s in candidates if s in selected]
+    if not matched:
+        return []
+    if len(matched) == len(candidates) and prefix:
+        return [prefix]
+    next_chars = sorted(set(s[len(prefix)] for s in matched))
+    result = []
+    for c in next_chars:
+        result.extend(_maximal_prefixes(candidates, selected, prefix + c))
+    return result
+
+def _format_char_class(chars: frozenset) -> str:
+    # Only digits and '-' occur in date prefixes, neither needs escaping outside a character class
+    if len(chars) == 1:
+        return next(iter(chars))
+    digits = sorted(chars)
+    # Collapse runs of 3+ consecutive digits into a range
+    parts = []
+    run_start = run_end = digits[0]
+    for c in digits[1:] + [None]:
+        if c is not None and ord(c) == ord(run_end) + 1:
+            run_end = c
+            continue
+        if ord(run_end) - ord(run_start) >= 2:
+            parts.append('{0}-{1}'.format(run_start, run_end))
+        else:
+            parts.append(''.join(chr(i) for i in range(ord(run_start), ord(run_end) + 1)))
+        if c is not None:
+            run_start = run_end = c
+    return '[' + ''.join(parts) + ']'
+
+def _merge_prefixes(prefixes: list) -> list:
+    # Each prefix is a tuple of character sets - repeatedly merge prefixes that differ in exactly one position
+    patterns = [tuple(frozenset(c) for c in p) for p in prefixes]
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        for i in range(len(patterns)):
+            for j in range(i + 1, len(patterns)):
+                a, b = patterns[i], patterns[j]
+                if len(a) != len(b):
+                    continue
+                diff = [k for k in range(len(a)) if a[k] != b[k]]
+                if len(diff) != 1:
+                    continue
+                k = diff[0]
+                patterns[i] = a[:k] + (a[k] | b[k],) + a[k + 1:]
+                del patterns[j]
+                merged_any = True
+                break
+            if merged_any:
+                break
+    return patterns
+
+def compile_date_range_regexes(first: date, last: date) -> list:
+    if first > last:
+        raise ValueError('Invalid date range: {0} is after {1}'.format(first, last))
+    prefixes = []
+    for year in range(first.year, last.year + 1):
+        year_first = max(first, date(year, 1, 1))
+        year_last = min(last, date(year, 12, 31))
+        if year_first == date(year, 1, 1) and year_last == date(year, 12, 31):
+            prefixes.append('{0:04d}'.format(year))
+            continue
+        selected = set(day.strftime('%m-%d') for day in _days_in_range(year_first, year_last))
+        for mmdd_prefix in _maximal_prefixes(_year_mmdd_strings(year), selected):
+            prefixes.append('{0:04d}-{1}'.format(year, mmdd_prefix))
+    return ['^' + ''.join(_format_char_class(c) for c in pattern) for pattern in _merge_prefixes(prefixes)]
+
+def verify_date_range_regexes(regexes: list, first: date, last: date):
+    # Brute-force reference: every day from the year before through the year after the range
+    compiled = [re.compile(r) for r in regexes]
+    for day in _days_in_range(date(first.year - 1, 1, 1), date(last.year + 1, 12, 31)):
+        expected = first <= day <= last
+        for value in [day.isoformat(), day.isoformat() + 'T12:00:00Z']:
+            if any(r.search(value) for r in compiled) != expected:
+                raise ValueError('Compiled regexes {0} disagree with date range {1} - {2} for: {3}'.format(regexes, first, last, value))
+
+@lru_cache(maxsize=None)
+def compile_first_launch_expression(first_string: str, last_string: str, exclude: bool) -> str:
+    first = parse_rule_date(first_string)
+    last = parse_rule_date(last_string)
+    regexes = compile_date_range_regexes(first, last)
+    verify_date_range_regexes(regexes, first, last)
+    if exclude:
+        return '(' + ' && '.join('!(FIRST_LAUNCH =~ "{0}")'.format(r) for r in regexes) + ')'
+    else:
+        return '(' + ' || '.join('(FIRST_LAUNCH =~ "{0}")'.format(r) for r in regexes) + ')'
+
+def gen_first_launch_expression(date_range: dict) -> str:
+    # (cached, since the brute-force verification is comparatively expensive)
+    return compile_first_launch_expression(date_range['from'], date_range['through'], bool(date_range.get('exclude', False)))
+
+def gen_rule_property_match(match: dict, latest_tag: str) -> str:
+    conditions = []
+    if match['tag'] == TAG_LATEST:
+        conditions.append('(GIT_TAG =~ "^{0}$")'.format(latest_tag))
+    elif match['tag'] == TAG_ANY:
+        conditions.append('(GIT_TAG =~ ".+")')
+    else:
+        raise ValueError('Unknown tag value in compat rule: {0}'.format(match['tag']))
+    if 'distributor' in match:
+        conditions.append('(WZ_PACKAGE_DISTRIBUTOR =~ "^{0}$")'.format(match['distributor']))
+    for module_name in match.get('loadedModules', []):
+        conditions.append('(WIN_LOADEDMODULENAMES =~ "\\"{0}\\"")'.format(module_name))
+    if 'firstLaunch' in match:
+        conditions.append(gen_first_launch_expression(match['firstLaunch']))
+    return ' && '.join(conditions)
+
+def _substitute(value, params: dict):
+    if isinstance(value, str):
+        return Template(value).safe_substitute(params)
+    if isinstance(value, dict):
+        return {k: _substitute(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, params) for v in value]
+    return value
+
+def gen_compat_notices(rules: list, tag: str, latest_tag: str, today: str) -> list:
+    # Build the compatNotices for all rules that apply to the specified tag match
+    params = {'latest_tag': latest_tag, 'today': today}
+    notices = []
+    for rule in rules:
+        if rule['match']['tag'] != tag:
+            continue
+        notice = dict()
+        notice['propertyMatch'] = gen_rule_property_match(rule['match'], latest_tag)
+        notice['id'] = rule['id']
+        notice['notification'] = _substitute(rule['notification'], params)
+        notice['infoLink'] = _substitute(rule['infoLink'], params)
+        notices.append(notice)
+    return notices
+
+def load_compat_rules(path: str) -> list:
+    with open(path, 'r') as rules_file:
+        return json.load(rules_file)['rules']
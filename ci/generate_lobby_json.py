@@ -6,13 +6,19 @@ import json
 import sys
 import getopt
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from collections import namedtuple
 import tarfile
 import re
+import fnmatch
 import urllib.request
 import os
+import subprocess
+import threading
 from pathlib import Path
 
+from github_api import get_github_api_url
+
 STABLE_RELEASE_GRACE_DAYS = 2
 
 # Modified version of urlretrieve from: https://github.com/python/cpython/blob/master/Lib/urllib/request.py
@@ -141,10 +147,11 @@ def gen_development_versionProperties(latestdevcommit: dict) -> dict:
     versionProps['supported'] = True
     return versionProps
 
+# support the last N development builds
+SUPPORTED_DEV_BUILDS_NUM = 30
+
 def get_development_netcodeMinorVerArray(latestdevcommit: dict) -> dict:
     latest_vcs_commit_count = int(latestdevcommit['wz_history']['commit_count'])
-    # support the last N development builds
-    SUPPORTED_DEV_BUILDS_NUM = 30
     return list(str(i) for i in range(latest_vcs_commit_count - (SUPPORTED_DEV_BUILDS_NUM - 1), latest_vcs_commit_count + 1))
 
 def create_path_for_file_if_not_exists(file_path):
@@ -159,48 +166,159 @@ def get_release_source_tarball_asset(release: dict):
 
 NetcodeVer = namedtuple('NetcodeVer', 'VerMajor VerMinor')
 
+NETPLAY_CONFIG_FILENAME = 'lib/netplay/netplay_config.gen'
+NETPLAY_CPP_FILENAME = 'lib/netplay/netplay.cpp'
+
+def find_netcode_ver_in_file_contents(readfilename: str, contents: str) -> NetcodeVer:
+    # find VERSION definitions
+    if readfilename == NETPLAY_CONFIG_FILENAME:
+        # the "autorevision"-generated netcode version file
+        result_major = re.search("static\s+uint32_t\s+NETCODE_VERSION_MAJOR\s*=\s*(\w+)\s*;", contents)
+        result_minor = re.search("static\s+uint32_t\s+NETCODE_VERSION_MINOR\s*=\s*(\w+)\s*;", contents)
+    else:
+        # the old, hard-coded info in netplay.cpp
+        result_major = re.search("static\s+int\s+NETCODE_VERSION_MAJOR\s*=\s*(\w+)\s*;", contents)
+        result_minor = re.search("static\s+int\s+NETCODE_VERSION_MINOR\s*=\s*(\w+)\s*;", contents)
+
+    if (not result_major) or (not result_minor):
+        print("Failed to find NETCODE_VERSION_MAJOR/MINOR in file: {0}".format(readfilename))
+        raise ValueError("Failed to find NETCODE_VERSION_MAJOR/MINOR in file: {0}".format(readfilename))
+
+    print(" - Found NETCODE_VERSION in: {0}".format(readfilename))
+    return NetcodeVer(result_major.group(1), result_minor.group(1))
+
 def get_netcode_ver_from_source_tarfile(path) -> NetcodeVer:
     with tarfile.open(path) as tf:        
         print("Extracting netcode ver from files in: {0}".format(path))
         # Try the "autorevision"-generated netcode version file
         try:
-            fileobj = tf.extractfile('warzone2100/lib/netplay/netplay_config.gen')
+            fileobj = tf.extractfile('warzone2100/' + NETPLAY_CONFIG_FILENAME)
         except KeyError:
             # did not find netplay_config.gen file in archive
             fileobj = None
 
         if not fileobj is None:
-            readfilename = 'lib/netplay/netplay_config.gen'
-            netplayconfig_contents = fileobj.read().decode('utf-8', 'ignore')
-            # find VERSION definitions
-            result_major = re.search("static\s+uint32_t\s+NETCODE_VERSION_MAJOR\s*=\s*(\w+)\s*;", netplayconfig_contents)
-            result_minor = re.search("static\s+uint32_t\s+NETCODE_VERSION_MINOR\s*=\s*(\w+)\s*;", netplayconfig_contents)
+            readfilename = NETPLAY_CONFIG_FILENAME
         else:
             # if that fails...
             # try the old, hard-coded info in netplay.cpp
             try:
-                fileobj = tf.extractfile('warzone2100/lib/netplay/netplay.cpp')
+                fileobj = tf.extractfile('warzone2100/' + NETPLAY_CPP_FILENAME)
             except KeyError:
                 # did not find older netplay.cpp in archive
                 raise ValueError("Source tarball did not have either expected file")
             
-            readfilename = 'lib/netplay/netplay.cpp'
-            netplay_contents = fileobj.read().decode('utf-8', 'ignore')
-        
-            # find VERSION definitions
-            result_major = re.search("static\s+int\s+NETCODE_VERSION_MAJOR\s*=\s*(\w+)\s*;", netplay_contents)
-            result_minor = re.search("static\s+int\s+NETCODE_VERSION_MINOR\s*=\s*(\w+)\s*;", netplay_contents)
+            readfilename = NETPLAY_CPP_FILENAME
 
-        if (not result_major) or (not result_minor):
-            print("Failed to find NETCODE_VERSION_MAJOR/MINOR in file: {0}".format(readfilename))
-            raise ValueError("Failed to find NETCODE_VERSION_MAJOR/MINOR in file: {0}".format(readfilename))
-    
-        print(" - Found NETCODE_VERSION in: {0}".format(readfilename))
-        return NetcodeVer(result_major.group(1), result_minor.group(1))
+        return find_netcode_ver_in_file_contents(readfilename, fileobj.read().decode('utf-8', 'ignore'))
+
+class GitMirrorNetcodeVerResolver:
+    # Reads the netcode version files for release tags from a local (bare) mirror of the game repository,
+    # through a single long-lived `git cat-file --batch` process (many tags are requested at once)
+
+    # If the mirror can't be used (or the git process exits), the resolver is disabled: every lookup
+    # returns None, so callers fall back to the release source tarball
+
+    def __init__(self, mirror_path: str):
+        self.mirror_path = mirror_path
+        self.process = None
+        self.results = {}
+        check = subprocess.run(['git', '--git-dir', mirror_path, 'rev-parse', '--git-dir'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if check.returncode != 0:
+            print("Not a valid git mirror: {0} - falling back to release source tarballs".format(mirror_path))
+            return
+        self.process = subprocess.Popen(['git', '--git-dir', mirror_path, 'cat-file', '--batch'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def close(self):
+        if not self.process is None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
+            self.process = None
+
+    def disable(self, reason: str):
+        print("Git mirror {0}: {1} - falling back to release source tarballs".format(self.mirror_path, reason))
+        self.close()
+
+    def read_objects(self, object_names: list) -> list:
+        # Returns the contents of each object (or None, if it does not exist) - in the same order
+        if self.process is None:
+            return [None] * len(object_names)
+        process = self.process
+        def write_requests():
+            # (written from a separate thread, so large responses can't block the requests)
+            try:
+                for object_name in object_names:
+                    process.stdin.write(object_name.encode('utf-8') + b'\n')
+                process.stdin.flush()
+            except BrokenPipeError:
+                # the process exited - handled by the reader (EOF)
+                pass
+        writer = threading.Thread(target=write_requests)
+        writer.start()
+        contents = []
+        for object_name in object_names:
+            header_line = process.stdout.readline()
+            if not header_line:
+                break
+            header = header_line.decode('utf-8').rstrip('\n').split(' ')
+            if len(header) != 3:
+                # "<object name> missing" / "<object name> ambiguous"
+                contents.append(None)
+                continue
+            size = int(header[2])
+            data = process.stdout.read(size)
+            if len(data) != size or not process.stdout.read(1): # (trailing newline)
+                break
+            contents.append(data if header[1] == 'blob' else None)
+        if len(contents) != len(object_names):
+            # unexpected EOF - drain any pending output, so the writer can't stay blocked
+            process.stdout.read()
+        writer.join()
+        if len(contents) != len(object_names):
+            self.disable('git cat-file exited unexpectedly')
+            contents = contents + [None] * (len(object_names) - len(contents))
+        return contents
+
+    def prefetch(self, tags: list):
+        # Resolve the netcode versions for all of the tags (that have not already been resolved) in one batch per file
+        remaining = [tag for tag in dict.fromkeys(tags) if tag not in self.results]
+        for readfilename in [NETPLAY_CONFIG_FILENAME, NETPLAY_CPP_FILENAME]:
+            if not remaining:
+                break
+            contents = self.read_objects(['{0}:{1}'.format(tag, readfilename) for tag in remaining])
+            not_found = []
+            for tag, data in zip(remaining, contents):
+                if data is None:
+                    not_found.append(tag)
+                    continue
+                try:
+                    self.results[tag] = find_netcode_ver_in_file_contents(readfilename, data.decode('utf-8', 'ignore'))
+                except ValueError:
+                    self.results[tag] = None
+            remaining = not_found
+        for tag in remaining:
+            self.results[tag] = None
+
+    def get_netcode_ver(self, tag: str):
+        # Returns None if the netcode version could not be found in the mirror
+        if tag not in self.results:
+            self.prefetch([tag])
+        return self.results[tag]
 
-def get_netcode_ver_from_release(release: dict, github_token = None, cache_directory = '_data', temp_directory = '_tmp') -> NetcodeVer:
+def get_netcode_ver_cache_file(tag: str, cache_directory = '_data') -> str:
+    return os.path.sep.join([cache_directory, 'net_ver', tag + '.json'])
+
+def write_netcode_ver_cache_file(cache_file: str, result: NetcodeVer):
+    create_path_for_file_if_not_exists(cache_file)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'NetcodeVer': {'Major': result.VerMajor, 'Minor': result.VerMinor}}, f, ensure_ascii=False, indent=2)
+
+def get_netcode_ver_from_release(release: dict, github_token = None, cache_directory = '_data', temp_directory = '_tmp', git_mirror = None) -> NetcodeVer:
     # First, see if we have the information cached in the _data/ directory
-    cache_file = os.path.sep.join([cache_directory, 'net_ver', release['tag_name'] + '.json'])
+    cache_file = get_netcode_ver_cache_file(release['tag_name'], cache_directory)
     create_path_for_file_if_not_exists(cache_file)
     try:
         with open(cache_file, 'r') as json_file:
@@ -220,9 +338,18 @@ def get_netcode_ver_from_release(release: dict, github_token = None, cache_direc
         print("Unexpected I/O error({0}): {1}".format(e.errno, e.strerror))
         raise
     
+    # Next, try reading the information from the local git mirror (if available)
+    if not git_mirror is None:
+        result = git_mirror.get_netcode_ver(release['tag_name'])
+        if not result is None:
+            print('{2}: Retrieved NETCODE version info from git mirror - Major:{0} Minor:{1}'.format(result.VerMajor, result.VerMinor, release['tag_name']))
+            write_netcode_ver_cache_file(cache_file, result)
+            return result
+        print('{0}: NETCODE version info not found in git mirror'.format(release['tag_name']))
+
     # If no usable cached info, download + extract the information from the release's source asset
     release_source_asset = get_release_source_tarball_asset(release)
-    source_dl_url = release_source_asset['url']
+    source_dl_url = get_github_api_url(release_source_asset['url'])
     print('Downloading {0} source tarball: {1}'.format(release['tag_name'], source_dl_url))
     tmp_dl_file = os.path.sep.join([temp_directory, 'release', release['tag_name'], 'source.tar.xz'])
     # Download the source tarball - must provide the token
@@ -244,51 +371,133 @@ def get_netcode_ver_from_release(release: dict, github_token = None, cache_direc
     os.remove(tmp_dl_file)
     
     # Cache the netcode version info
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump({'NetcodeVer': {'Major': result.VerMajor, 'Minor': result.VerMinor}}, f, ensure_ascii=False, indent=2)
+    write_netcode_ver_cache_file(cache_file, result)
     
     return result
 
+@lru_cache(maxsize=None)
 def convert_github_json_date_to_datetime(github_date_string: str):
     return datetime.strptime(github_date_string, '%Y-%m-%dT%H:%M:%SZ')
 
-def allowed_prior_stable_release(release: dict):
+def allowed_prior_stable_release(release: dict, now = None):
+    if now is None:
+        now = datetime.now()
     release_published_at = convert_github_json_date_to_datetime(release['published_at'])
-    return ((datetime.now() - release_published_at).days <= STABLE_RELEASE_GRACE_DAYS)
+    return ((now - release_published_at).days <= STABLE_RELEASE_GRACE_DAYS)
 
-def get_releases_netcodeVersions(latestgithubrelease: dict, releaselist: list) -> list:
-    github_token = os.getenv("GITHUB_TOKEN", default=None)
-    
-    versions = []
-    
+def get_allowed_prior_stable_releases(latestgithubrelease: dict, releaselist: list, now = None) -> list:
+    if now is None:
+        now = datetime.now()
+    allowed_prior_releases = []
     try:
         latest_release_published_at = convert_github_json_date_to_datetime(latestgithubrelease['published_at'])
-        if (datetime.now() - latest_release_published_at).days <= STABLE_RELEASE_GRACE_DAYS:
-            allowed_prior_releases = []
+        if (now - latest_release_published_at).days <= STABLE_RELEASE_GRACE_DAYS:
             # Also permit at least one prior release, since the new release is brand-new (and any stable releases within past STABLE_RELEASE_GRACE_DAYS days)
             prior_stable_releases = get_prior_stable_releases(latestgithubrelease, releaselist)
             if prior_stable_releases:
-                allowed_prior_releases_iterator = filter(allowed_prior_stable_release, prior_stable_releases)
-                allowed_prior_releases = list(allowed_prior_releases_iterator)
+                allowed_prior_releases = [release for release in prior_stable_releases if allowed_prior_stable_release(release, now)]
                 if not allowed_prior_releases:
                     # Ensure at least one (the last) prior release is permitted when a new release is brand-new
                     allowed_prior_releases.append(prior_stable_releases[0])
-            for prior_release in allowed_prior_releases:
-                versions.append(get_netcode_ver_from_release(prior_release, github_token))
     except ValueError as e:
         # Parsing the JSON dates into datetime objects likely failed
         print("Failed to extract additional previous stable releases from release info, with error: {0}".format(str(e)))
         print("Skipping this step")
+    return allowed_prior_releases
+
+def get_releases_netcodeVersions(latestgithubrelease: dict, releaselist: list, cache_directory = '_data', temp_directory = '_tmp', now = None, git_mirror_path = None) -> list:
+    github_token = os.getenv("GITHUB_TOKEN", default=None)
     
-    versions.append(get_netcode_ver_from_release(latestgithubrelease, github_token))
+    git_mirror = None
+    if git_mirror_path:
+        git_mirror = GitMirrorNetcodeVerResolver(git_mirror_path)
     
-    result = get_newer_prereleases(latestgithubrelease, releaselist)
-    if result.latest_prerelease:
-        versions.append(get_netcode_ver_from_release(result.latest_prerelease, github_token))
+    versions = []
+    
+    try:
+        if not git_mirror is None:
+            # Resolve all of the tags that are not already cached from the local git mirror in one batch
+            try:
+                candidate_releases = get_allowed_prior_stable_releases(latestgithubrelease, releaselist, now)
+            except ValueError:
+                candidate_releases = []
+            candidate_releases = candidate_releases + [latestgithubrelease, get_newer_prereleases(latestgithubrelease, releaselist).latest_prerelease]
+            git_mirror.prefetch([release['tag_name'] for release in candidate_releases if release and not os.path.exists(get_netcode_ver_cache_file(release['tag_name'], cache_directory))])
+
+        try:
+            for prior_release in get_allowed_prior_stable_releases(latestgithubrelease, releaselist, now):
+                versions.append(get_netcode_ver_from_release(prior_release, github_token, cache_directory, temp_directory, git_mirror))
+        except ValueError as e:
+            print("Failed to extract additional previous stable releases from release info, with error: {0}".format(str(e)))
+            print("Skipping this step")
+
+        versions.append(get_netcode_ver_from_release(latestgithubrelease, github_token, cache_directory, temp_directory, git_mirror))
+        
+        result = get_newer_prereleases(latestgithubrelease, releaselist)
+        if result.latest_prerelease:
+            versions.append(get_netcode_ver_from_release(result.latest_prerelease, github_token, cache_directory, temp_directory, git_mirror))
+    finally:
+        if not git_mirror is None:
+            git_mirror.close()
     
     return versions
 
-def gen_lobby_file(latestgithubrelease: dict, releaselist: list, latestdevcommit: dict) -> dict:
+def get_known_version_strings(latestgithubrelease: dict, releaselist: list, latestdevcommit: dict, now = None) -> list:
+    version_strings = []
+    result = get_newer_prereleases(latestgithubrelease, releaselist)
+    version_strings.extend(release['tag_name'] for release in result.prerelease_list)
+    version_strings.append(latestgithubrelease['tag_name'])
+    version_strings.extend(release['tag_name'] for release in get_allowed_prior_stable_releases(latestgithubrelease, releaselist, now))
+    # development builds report: "master <short hash>"
+    # (the supported development builds - see: get_development_netcodeMinorVerArray - are the latest successful commit and
+    # the commits before it, as recorded by process_latest_successful_commit.py. This assumes the linear history of the
+    # master branch, where the Nth commit before the latest is the build with commit count: commit_count - N.
+    # If the commit list was not recorded, only the latest development build is listed - the others use the globs.)
+    dev_commit_shas = latestdevcommit['wz_history'].get('recent_commits') or [latestdevcommit['sha']]
+    version_strings.extend('master {0}'.format(sha[0:7]) for sha in dev_commit_shas[:SUPPORTED_DEV_BUILDS_NUM])
+    return list(dict.fromkeys(version_strings))
+
+def match_versionProperties_glob(versionProperties: list, version_string: str):
+    # The lobby server uses the first versionProperties entry whose versionStringGlob matches
+    for index, versionProps in enumerate(versionProperties):
+        if fnmatch.fnmatchcase(version_string, versionProps['versionStringGlob']):
+            return index
+    return None
+
+def gen_versionPropertiesExactMatch(versionProperties: list, version_strings: list) -> dict:
+    exact_matches = dict()
+    for version_string in version_strings:
+        index = match_versionProperties_glob(versionProperties, version_string)
+        if not index is None:
+            exact_matches[version_string] = index
+    return exact_matches
+
+def match_versionProperties(lobbyinfo: dict, version_string: str) -> dict:
+    # Reference matcher: a single lookup in versionPropertiesExactMatch, falling back to the ordered globs
+    index = lobbyinfo.get('versionPropertiesExactMatch', {}).get(version_string)
+    if index is None:
+        index = match_versionProperties_glob(lobbyinfo['versionProperties'], version_string)
+        if index is None:
+            return None
+    return lobbyinfo['versionProperties'][index]
+
+def verify_versionPropertiesExactMatch(lobbyinfo: dict, version_strings: list):
+    # The exact matches must contain exactly the known version strings, and each must select the entry that
+    # the lobby server's ordered walk of the versionStringGlob rules (fnmatch - case-sensitive) selects
+    exact_matches = lobbyinfo['versionPropertiesExactMatch']
+    glob_regexes = [re.compile(fnmatch.translate(versionProps['versionStringGlob'])) for versionProps in lobbyinfo['versionProperties']]
+    for version_string in version_strings:
+        expected_index = next((index for index, regex in enumerate(glob_regexes) if regex.match(version_string)), None)
+        if exact_matches.get(version_string) != expected_index:
+            raise ValueError('versionPropertiesExactMatch[{0}] is {1}, but the versionStringGlob rules select: {2}'.format(version_string, exact_matches.get(version_string), expected_index))
+    for version_string in exact_matches:
+        if not version_string in version_strings:
+            raise ValueError('versionPropertiesExactMatch contains an unknown version string: {0}'.format(version_string))
+
+def gen_lobby_file(latestgithubrelease: dict, releaselist: list, latestdevcommit: dict, release_versions = None, now = None, git_mirror_path = None, verify = True) -> dict:
+    # now: the current (UTC) time - defaults to the system clock
+    # verify: check the versionPropertiesExactMatch lookup table against the versionStringGlob rules
+    # git_mirror_path: (optional) local mirror of the game repository, used before downloading release source tarballs
     lobbyinfo = dict()
     lobbyinfo['listMOTD_Default'] = 'Welcome! The latest version of Warzone 2100 is {0}\nDownload @ https://wz2100.net'.format(latestgithubrelease['tag_name'])
     lobbyinfo['listMOTD_LastHostedGame'] = 'Welcome! The latest version of Warzone 2100 is {0} - Download @ https://wz2100.net\n**NEWS**: Join Autohost matches for ratings and leaderboards @ wz2100-autohost.net'.format(latestgithubrelease['tag_name'])
@@ -302,6 +511,12 @@ def gen_lobby_file(latestgithubrelease: dict, releaselist: list, latestdevcommit
     lobbyinfo['versionProperties'].append(gen_development_versionProperties(latestdevcommit))
     lobbyinfo['versionProperties'].append({ 'versionStringGlob': '*', 'motd': 'Please upgrade your Warzone to {0}! Your version is NOT supported.\nSee: https://wz2100.net'.format(latestgithubrelease['tag_name']), 'supported': False })
     
+    # precomputed lookup table (version string -> index in versionProperties) for all known version strings
+    known_version_strings = get_known_version_strings(latestgithubrelease, releaselist, latestdevcommit, now)
+    lobbyinfo['versionPropertiesExactMatch'] = gen_versionPropertiesExactMatch(lobbyinfo['versionProperties'], known_version_strings)
+    if verify:
+        verify_versionPropertiesExactMatch(lobbyinfo, known_version_strings)
+    
     lobbyinfo['supportedNetcodeVerMajorMinor'] = {}
     
     def addSupportedNetcodeVer(VerMajor, VerMinor = None):
@@ -320,7 +535,8 @@ def gen_lobby_file(latestgithubrelease: dict, releaselist: list, latestdevcommit
     # master branch (development builds)
     lobbyinfo['supportedNetcodeVerMajorMinor']['0x10a0'] = get_development_netcodeMinorVerArray(latestdevcommit)
     # latest release + latest pre-release
-    release_versions = get_releases_netcodeVersions(latestgithubrelease, releaselist)
+    if release_versions is None:
+        release_versions = get_releases_netcodeVersions(latestgithubrelease, releaselist, now=now, git_mirror_path=git_mirror_path)
     for version in release_versions:
         addSupportedNetcodeVer(version.VerMajor, version.VerMinor)
     
@@ -331,17 +547,18 @@ def main(argv):
     releaselist_filepath = ''
     latestdevcommit_filepath = ''
     output_filepath = ''
+    gitmirror_path = None
     latestrelease = {}
     releaselist = []
     latestdevcommit = {}
     try:
-        opts, args = getopt.getopt(argv,"hr:i:d:o:",["latestrelease=","releaselist=","latestdevcommit=","output="])
+        opts, args = getopt.getopt(argv,"hr:i:d:o:g:",["latestrelease=","releaselist=","latestdevcommit=","output=","gitmirror="])
     except getopt.GetoptError:
-        print ('generate_lobby_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> -o <outputfile.json>')
+        print ('generate_lobby_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> -o <outputfile.json> [-g <gitmirror>]')
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print ('generate_lobby_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> -o <outputfile.json>')
+            print ('generate_lobby_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> -o <outputfile.json> [-g <gitmirror>]')
             sys.exit()
         elif opt in ("-r", "--latestrelease"):
             latestrelease_filepath = arg
@@ -351,10 +568,14 @@ def main(argv):
             latestdevcommit_filepath = arg
         elif opt in ("-o", "--output"):
             output_filepath = arg
+        elif opt in ("-g", "--gitmirror"):
+            gitmirror_path = arg
     print ('latestrelease filepath file is: ', latestrelease_filepath)
     print ('releaselist filepath file is: ', releaselist_filepath)
     print ('latestdevcommit filepath file is: ', latestdevcommit_filepath)
     print ('output_filepath is: ', output_filepath)
+    if gitmirror_path:
+        print ('gitmirror is: ', gitmirror_path)
     try:
         with open(latestrelease_filepath, 'r') as release_file, open(releaselist_filepath, 'r') as releaselist_file, open(latestdevcommit_filepath, 'r') as devcommit_file:
             latestrelease = json.load(release_file)
@@ -367,7 +588,7 @@ def main(argv):
     except IOError as e:
         print("Unexpected I/O error({0}): {1}".format(e.errno, e.strerror))
         raise
-    lobby_json = gen_lobby_file(latestrelease, releaselist, latestdevcommit)
+    lobby_json = gen_lobby_file(latestrelease, releaselist, latestdevcommit, git_mirror_path=gitmirror_path)
     with open(output_filepath, 'w', encoding='utf-8') as f:
         json.dump(lobby_json, f, ensure_ascii=False, indent=2)
 
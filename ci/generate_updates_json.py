@@ -4,6 +4,8 @@ import json
 import sys
 import getopt
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from shared_expressions import share_document_expressions
 
 def gen_prerelease_channel(latestgithubrelease: dict, releaselist: list) -> dict:
     try:
@@ -84,16 +86,23 @@ def get_prior_stable_releases(latestgithubrelease: dict, releaselist: list) -> d
     
     return priorrelease_list
 
+@lru_cache(maxsize=None)
 def convert_github_json_date_to_datetime(github_date_string: str):
     return datetime.strptime(github_date_string, '%Y-%m-%dT%H:%M:%SZ')
 
 MS_STORE_RELEASE_GRACE_DAYS = 3
 
-def msstore_allowed_prior_stable_release(release: dict):
+VALID_THRU_HOURS = 25
+
+def msstore_allowed_prior_stable_release(release: dict, now = None):
+    if now is None:
+        now = datetime.now()
     release_published_at = convert_github_json_date_to_datetime(release['published_at'])
-    return ((datetime.now() - release_published_at).days <= MS_STORE_RELEASE_GRACE_DAYS)
+    return ((now - release_published_at).days <= MS_STORE_RELEASE_GRACE_DAYS)
 
-def gen_msstore_release_channel(latestgithubrelease: dict, releaselist: list) -> dict:
+def gen_msstore_release_channel(latestgithubrelease: dict, releaselist: list, now = None) -> dict:
+    if now is None:
+        now = datetime.now()
     channel = dict()
     channel['channel'] = 'release_ms_store'
     channel['channelConditional'] = '(WIN_PACKAGE_FULLNAME =~ "^48148WZ2100Project.Warzone2100forWindows_.*$") && (GIT_TAG =~ ".+")'
@@ -108,9 +117,8 @@ def gen_msstore_release_channel(latestgithubrelease: dict, releaselist: list) ->
     if prior_stable_releases:
         try:
             latest_release_published_at = convert_github_json_date_to_datetime(latestgithubrelease['published_at'])
-            latest_release_age_days = (datetime.now() - latest_release_published_at).days
-            allowed_prior_releases_iterator = filter(msstore_allowed_prior_stable_release, prior_stable_releases)
-            allowed_prior_releases = list(allowed_prior_releases_iterator)
+            latest_release_age_days = (now - latest_release_published_at).days
+            allowed_prior_releases = [release for release in prior_stable_releases if msstore_allowed_prior_stable_release(release, now)]
             if (not allowed_prior_releases) and (latest_release_age_days <= MS_STORE_RELEASE_GRACE_DAYS):
                 # Ensure at least one (the last) prior release is permitted when a new release is brand-new
                 allowed_prior_releases.append(prior_stable_releases[0])
@@ -190,15 +198,16 @@ def gen_development_channel(latestdevcommit: dict) -> dict:
         raise
     return channel
 
-def gen_updates_file(latestgithubrelease: dict, releaselist: list, latestdevcommit: dict) -> dict:
+def gen_updates_file(latestgithubrelease: dict, releaselist: list, latestdevcommit: dict, now = None) -> dict:
+    # now: the current (UTC) time - defaults to the system clock
     updates = dict()
-    valid_thru = datetime.utcnow() + timedelta(hours=25)
+    valid_thru = (datetime.utcnow() if now is None else now) + timedelta(hours=VALID_THRU_HOURS)
     updates['validThru'] = valid_thru.replace(microsecond=0, tzinfo=timezone.utc).isoformat()
     updates['channels'] = []
     prerelease_channel = gen_prerelease_channel(latestgithubrelease, releaselist)
     if not prerelease_channel is None:
         updates['channels'].append(prerelease_channel)
-    updates['channels'].append(gen_msstore_release_channel(latestgithubrelease, releaselist))
+    updates['channels'].append(gen_msstore_release_channel(latestgithubrelease, releaselist, now))
     updates['channels'].append(gen_release_channel(latestgithubrelease))
     updates['channels'].append(gen_development_channel(latestdevcommit))
     return updates
@@ -207,17 +216,18 @@ def main(argv):
     latestrelease_filepath = ''
     releaselist_filepath = ''
     latestdevcommit_filepath = ''
+    shared_expressions = False
     latestrelease = {}
     releaselist = []
     latestdevcommit = {}
     try:
-        opts, args = getopt.getopt(argv,"hr:i:d:",["latestrelease=","releaselist=","latestdevcommit="])
+        opts, args = getopt.getopt(argv,"hr:i:d:s",["latestrelease=","releaselist=","latestdevcommit=","shared-expressions"])
     except getopt.GetoptError:
-        print ('generate_updates_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json>')
+        print ('generate_updates_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> [-s]')
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print ('generate_updates_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json>')
+            print ('generate_updates_json.py -r <latestrelease.json> -i <releaselist.json> -d <latestdevcommit.json> [-s]')
             sys.exit()
         elif opt in ("-r", "--latestrelease"):
             latestrelease_filepath = arg
@@ -225,6 +235,8 @@ def main(argv):
             releaselist_filepath = arg
         elif opt in ("-d", "--latestdevcommit"):
             latestdevcommit_filepath = arg
+        elif opt in ("-s", "--shared-expressions"):
+            shared_expressions = True
     print ('latestrelease filepath file is: ', latestrelease_filepath)
     print ('releaselist filepath file is: ', releaselist_filepath)
     print ('latestdevcommit filepath file is: ', latestdevcommit_filepath)
@@ -241,6 +253,9 @@ def main(argv):
         print("Unexpected I/O error({0}): {1}".format(e.errno, e.strerror))
         raise
     updates_json = gen_updates_file(latestrelease, releaselist, latestdevcommit)
+    if shared_expressions:
+        # (requires clients that support the shared expressions format)
+        updates_json = share_document_expressions(updates_json)
     with open('updates.json', 'w', encoding='utf-8') as f:
         json.dump(updates_json, f, ensure_ascii=False, indent=2)
 
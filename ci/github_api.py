@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+#
+# GitHub API client for the ci scripts
+#
+# - Persistent response cache (keyed by url + Accept header): stores the ETag / Last-Modified of each
+#   response, sends them as conditional request headers, and serves "304 Not Modified" responses from disk
+#   (conditional requests that return 304 do not count against the GitHub API rate limit)
+# - Re-uses pooled keep-alive connections per host
+#
+# Uses GITHUB_API_URL (if set) as the API base url - for example, a local replay server (see: replay_server.py)
+
+import sys
+import argparse
+import hashlib
+import json
+import os
+import threading
+import urllib.parse
+from pathlib import Path
+
+from http_pool import ConnectionPool
+
+DEFAULT_GITHUB_API_URL = 'https://api.github.com'
+DEFAULT_ACCEPT = 'application/vnd.github+json'
+MAX_REDIRECTS = 5
+
+class GitHubAPIError(RuntimeError):
+    def __init__(self, url: str, status: int, body: bytes):
+        super().__init__('GitHub API request failed ({0}): {1}'.format(status, url))
+        self.url = url
+        self.status = status
+        self.body = body
+
+def get_github_api_url(url: str, api_url = None) -> str:
+    # Point GitHub API urls at api_url (default: GITHUB_API_URL, if set) - for example, a local replay server
+    if api_url is None:
+        api_url = os.getenv("GITHUB_API_URL", default=DEFAULT_GITHUB_API_URL)
+    if url.startswith(DEFAULT_GITHUB_API_URL + '/'):
+        return api_url.rstrip('/') + url[len(DEFAULT_GITHUB_API_URL):]
+    return url
+
+def log(message: str):
+    # stdout may be used for response output
+    print(message, file=sys.stderr)
+
+class GitHubAPIClient:
+    def __init__(self, github_token = None, cache_directory = None, api_url = None):
+        self.github_token = github_token
+        self.cache_directory = cache_directory
+        if api_url is None:
+            api_url = os.getenv("GITHUB_API_URL", default=DEFAULT_GITHUB_API_URL)
+        self.api_url = api_url.rstrip('/')
+        self.pool = ConnectionPool()
+        # Request statistics (by result: 'fetched', 'not_modified', 'error')
+        self.stats = {'fetched': 0, 'not_modified': 0, 'error': 0}
+        self.stats_lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+
+    def get_url(self, path: str) -> str:
+        if path.startswith('https://') or path.startswith('http://'):
+            return get_github_api_url(path, self.api_url)
+        return self.api_url + '/' + path.lstrip('/')
+
+    def count(self, result: str):
+        with self.stats_lock:
+            self.stats[result] += 1
+
+    def send(self, method: str, url: str, headers: dict, body: bytes = None):
+        # Returns: (status, response headers, response body) - follows redirects for GET requests
+        api_netloc = urllib.parse.urlsplit(self.api_url).netloc
+        for _ in range(MAX_REDIRECTS + 1):
+            split_url = urllib.parse.urlsplit(url)
+            request_headers = dict(headers)
+            if (not self.github_token is None) and self.github_token and split_url.netloc == api_netloc:
+                # Only send the token to the API host (not to redirect targets)
+                request_headers['Authorization'] = 'token ' + self.github_token
+            response, response_body = self.pool.request(method, url, request_headers, body)
+            if method == 'GET' and response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            return response.status, response.headers, response_body
+        raise GitHubAPIError(url, response.status, response_body)
+
+    def get_cache_path(self, url: str, accept: str) -> str:
+        key = hashlib.sha256((accept + '\n' + url).encode('utf-8')).hexdigest()
+        return os.path.sep.join([self.cache_directory, key[:2], key + '.json'])
+
+    def load_cache_entry(self, cache_path: str):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (ValueError, IOError) as e:
+            log('Ignoring unreadable cache file: {0} ({1})'.format(cache_path, str(e)))
+            return None
+
+    def save_cache_entry(self, cache_path: str, url: str, headers, body: bytes):
+        entry = {'url': url, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+        if entry['etag'] is None and entry['last_modified'] is None:
+            return
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            # Only cache text (API) responses
+            return
+        Path(os.path.dirname(cache_path)).mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path + '.tmp-{0}-{1}'.format(os.getpid(), threading.get_ident())
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(entry, cache_file, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+
+    def get(self, path: str, accept: str = DEFAULT_ACCEPT) -> bytes:
+        url = self.get_url(path)
+        headers = {'Accept': accept, 'User-Agent': 'wz2100-update-data'}
+        cache_path = None
+        cache_entry = None
+        if self.cache_directory:
+            cache_path = self.get_cache_path(url, accept)
+            cache_entry = self.load_cache_entry(cache_path)
+            if not cache_entry is None:
+                if cache_entry.get('etag'):
+                    headers['If-None-Match'] = cache_entry['etag']
+                if cache_entry.get('last_modified'):
+                    headers['If-Modified-Since'] = cache_entry['last_modified']
+        status, response_headers, body = self.send('GET', url, headers)
+        if status == 304 and not cache_entry is None:
+            log('Not modified (cached): {0}'.format(url))
+            self.count('not_modified')
+            return cache_entry['body'].encode('utf-8')
+        if status != 200:
+            self.count('error')
+            raise GitHubAPIError(url, status, body)
+        log('Fetched: {0}'.format(url))
+        self.count('fetched')
+        if not cache_path is None:
+            self.save_cache_entry(cache_path, url, response_headers, body)
+        return body
+
+    def get_json(self, path: str, accept: str = DEFAULT_ACCEPT):
+        return json.loads(self.get(path, accept).decode('utf-8'))
+
+    def graphql(self, query: str, graphql_url = None) -> dict:
+        if graphql_url is None:
+            graphql_url = os.getenv("GITHUB_GRAPHQL_URL", default=self.api_url + '/graphql')
+        headers = {'Content-Type': 'application/json', 'User-Agent': 'wz2100-update-data'}
+        if (not self.github_token is None) and self.github_token:
+            headers['Authorization'] = 'bearer ' + self.github_token
+        status, response_headers, body = self.send('POST', graphql_url, headers, json.dumps({'query': query}).encode('utf-8'))
+        if status != 200:
+            self.count('error')
+            raise GitHubAPIError(graphql_url, status, body)
+        self.count('fetched')
+        return json.loads(body.decode('utf-8'))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Fetch GitHub API urls (with a persistent ETag / Last-Modified response cache)')
+    parser.add_argument('command', choices=['get'])
+    parser.add_argument('paths', type=str, nargs='+', metavar='path', help='API path (for example: /repos/org/repo/releases) or full url')
+    parser.add_argument('-o', '--output', type=str, action='append', default=None, help='output file, once per path (default: stdout)')
+    parser.add_argument('-a', '--accept', type=str, default=DEFAULT_ACCEPT)
+    parser.add_argument('-c', '--cache-dir', type=str, default=os.getenv("GITHUB_API_CACHE_DIR", default=None))
+    args = parser.parse_intermixed_args(argv)
+    if not args.output is None and len(args.output) != len(args.paths):
+        parser.error('expected one --output per path')
+    if args.output is None and len(args.paths) > 1:
+        parser.error('--output is required when fetching multiple paths')
+
+    # (one client for all paths - so the pooled connection is re-used)
+    client = GitHubAPIClient(os.getenv("GITHUB_TOKEN", default=None), args.cache_dir)
+    try:
+        for index, path in enumerate(args.paths):
+            body = client.get(path, args.accept)
+            if args.output is None:
+                sys.stdout.buffer.write(body)
+            else:
+                with open(args.output[index], 'wb') as f:
+                    f.write(body)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
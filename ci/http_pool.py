@@ -0,0 +1,59 @@
+# Pooled keep-alive HTTP(S) connections (per host), shared by the ci scripts' API clients
+# (see: github_api.py, and the Cloudflare cache purge in pipeline.py)
+
+import http.client
+import threading
+import urllib.parse
+
+class ConnectionPool:
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme: str, netloc: str):
+        with self.lock:
+            connections = self.idle.get((scheme, netloc))
+            if connections:
+                return connections.pop(), True
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout), False
+        return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+
+    def release(self, scheme: str, netloc: str, connection):
+        with self.lock:
+            self.idle.setdefault((scheme, netloc), []).append(connection)
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle = {}
+
+    def request(self, method: str, url: str, headers: dict, body: bytes = None):
+        # Returns: (response, response body) - redirects are not followed
+        split_url = urllib.parse.urlsplit(url)
+        target = split_url.path or '/'
+        if split_url.query:
+            target += '?' + split_url.query
+        while True:
+            connection, reused = self.acquire(split_url.scheme, split_url.netloc)
+            try:
+                connection.request(method, target, body=body, headers=headers)
+                response = connection.getresponse()
+                response_body = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+                # The pooled keep-alive connection was closed by the server - retry with a new connection
+            except:
+                connection.close()
+                raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.release(split_url.scheme, split_url.netloc, connection)
+        return response, response_body
@@ -0,0 +1,510 @@
+#!/usr/bin/python3
+#
+# Run the whole update pipeline (see: .github/workflows/generate_updates_json.yml) as a dependency graph of stages
+#
+# - Each stage declares its (typed) input and output artifacts, and stages run as soon as their inputs are available,
+#   so independent stages run concurrently (i.e. release fetching alongside dev commit discovery, netcode version
+#   resolution alongside updates / compat generation, compiling signjson alongside everything else)
+# - A stage that finds nothing to do returns SKIPPED, and all of its downstream stages are skipped as well
+#   (i.e. nothing is published, purged, or sent to the lobby server if no file changed)
+# - Stages marked "memoize" re-use their outputs from the previous run (see: --state) when their input artifacts are unchanged
+# - A per-stage timing report (including the critical path) is printed, and can be written as JSON (see: --report)
+#
+# Optional environment variables: GITHUB_TOKEN, GITHUB_API_URL, GITHUB_GRAPHQL_URL, GITHUB_API_CACHE_DIR,
+# SIGNJSON_B64_SECRETKEY, WZ2100_UPDATES_PUSH_TOKEN, CLOUDFLARE_API_URL, CLOUDFLARE_WZ2100_ZONE,
+# CLOUDFLARE_WZ2100_CACHEPURGE_TOKEN, LOBBY_SERVER_INFORM_COMMAND, LOBBY_SERVER_INFORM_PASS
+
+import sys
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from github_api import GitHubAPIClient, GitHubAPIError
+from http_pool import ConnectionPool
+from process_latest_successful_commit import process_latest_successful_commit
+from generate_updates_json import gen_updates_file
+from generate_compat_json import gen_compat_file, DEFAULT_COMPAT_RULES_FILEPATH
+from compat_rules import load_compat_rules
+from generate_lobby_json import gen_lobby_file, get_releases_netcodeVersions, NetcodeVer
+from gen_purge_url_batches import generatePurgeURLsList, MAX_URLS_PER_BATCH
+from inform_lobby import sendLobbyCommand
+
+CI_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Keys that are ignored when comparing newly-generated files with the published files
+FILTERED_KEYS = ['SIGNATURE', 'validThru']
+
+# Returned by a stage function to skip the stage (and everything downstream of it)
+SKIPPED = object()
+
+class PipelineError(RuntimeError):
+    pass
+
+# func: called with the PipelineConfig + the input artifacts (as keyword arguments), returns a dict of the output artifacts (or SKIPPED)
+# inputs: the names of the input artifacts
+# outputs: dict of output artifact name -> type
+# memoize: re-use the outputs of the previous run if the inputs are unchanged (the outputs must be JSON-serializable)
+# reusable: (optional) called with the PipelineConfig + the previous outputs, to check that memoized outputs are still usable
+Stage = namedtuple('Stage', 'name func inputs outputs memoize reusable', defaults=[(), {}, False, None])
+
+StageResult = namedtuple('StageResult', 'name status start end outputs')
+
+def artifact_digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+class Pipeline:
+    def __init__(self, stages: list):
+        self.stages = {}
+        self.producers = {}
+        self.artifact_types = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise PipelineError('Duplicate stage: {0}'.format(stage.name))
+            self.stages[stage.name] = stage
+            for output_name, output_type in stage.outputs.items():
+                if output_name in self.producers:
+                    raise PipelineError('Artifact {0} is produced by both {1} and {2}'.format(output_name, self.producers[output_name], stage.name))
+                self.producers[output_name] = stage.name
+                self.artifact_types[output_name] = output_type
+        self.dependencies = {}
+        for stage in stages:
+            for input_name in stage.inputs:
+                if input_name not in self.producers:
+                    raise PipelineError('No stage produces input {0} of stage {1}'.format(input_name, stage.name))
+            self.dependencies[stage.name] = sorted(set(self.producers[input_name] for input_name in stage.inputs))
+        self.order = self.topological_order()
+
+    def topological_order(self) -> list:
+        order = []
+        state = {}
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise PipelineError('Dependency cycle: {0}'.format(' -> '.join(path + [name])))
+            state[name] = 'visiting'
+            for dependency in self.dependencies[name]:
+                visit(dependency, path + [name])
+            state[name] = 'done'
+            order.append(name)
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def check_outputs(self, stage: Stage, outputs: dict):
+        for output_name, output_type in stage.outputs.items():
+            if output_name not in outputs:
+                raise PipelineError('Stage {0} did not produce output: {1}'.format(stage.name, output_name))
+            if not isinstance(outputs[output_name], output_type):
+                raise PipelineError('Stage {0} output {1} is {2}, expected: {3}'.format(stage.name, output_name, type(outputs[output_name]).__name__, output_type.__name__))
+
+    def run_stage(self, config, stage: Stage, artifacts: dict, previous_state: dict):
+        start = time.monotonic()
+        inputs = {input_name: artifacts[input_name] for input_name in stage.inputs}
+        inputs_digest = artifact_digest(inputs)
+        previous = previous_state.get(stage.name)
+        if stage.memoize and previous and previous.get('inputs_digest') == inputs_digest and (stage.reusable is None or stage.reusable(config, previous['outputs'])):
+            print('[{0}] Inputs unchanged - re-using previous outputs'.format(stage.name))
+            outputs = previous['outputs']
+            self.check_outputs(stage, outputs)
+            return StageResult(stage.name, 'unchanged', start, time.monotonic(), outputs), inputs_digest
+        print('[{0}] Starting'.format(stage.name))
+        outputs = stage.func(config, **inputs)
+        if outputs is SKIPPED:
+            print('[{0}] Nothing to do - skipping downstream stages'.format(stage.name))
+            return StageResult(stage.name, 'skipped', start, time.monotonic(), {}), inputs_digest
+        self.check_outputs(stage, outputs)
+        print('[{0}] Finished'.format(stage.name))
+        return StageResult(stage.name, 'done', start, time.monotonic(), outputs), inputs_digest
+
+    def run(self, config, max_workers: int = 8, previous_state = None) -> dict:
+        previous_state = previous_state or {}
+        artifacts = {}
+        results = {}
+        new_state = {}
+        pending = list(self.order)
+        running = {}
+        pipeline_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    dependencies = self.dependencies[name]
+                    if any(dependency not in results for dependency in dependencies):
+                        continue
+                    pending.remove(name)
+                    skipped_dependencies = [dependency for dependency in dependencies if results[dependency].status in ('skipped', 'not run')]
+                    if skipped_dependencies:
+                        now = time.monotonic()
+                        results[name] = StageResult(name, 'not run', now, now, {})
+                        continue
+                    running[executor.submit(self.run_stage, config, self.stages[name], dict(artifacts), previous_state)] = name
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        result, inputs_digest = future.result()
+                    except Exception as e:
+                        for other in running:
+                            other.cancel()
+                        raise PipelineError('Stage {0} failed: {1}'.format(name, str(e))) from e
+                    results[name] = result
+                    artifacts.update(result.outputs)
+                    if self.stages[name].memoize and result.status in ('done', 'unchanged'):
+                        new_state[name] = {'inputs_digest': inputs_digest, 'outputs': result.outputs}
+        return {'results': results, 'state': new_state, 'artifacts': artifacts, 'start': pipeline_start, 'end': time.monotonic()}
+
+    def critical_path(self, results: dict) -> list:
+        # Walk back from the last stage to finish, always through the dependency that finished last
+        ran = [r for r in results.values() if r.status in ('done', 'unchanged', 'skipped')]
+        if not ran:
+            return []
+        path = [max(ran, key=lambda r: r.end)]
+        while True:
+            dependencies = [results[d] for d in self.dependencies[path[-1].name] if results[d].status in ('done', 'unchanged', 'skipped')]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda r: r.end))
+        return list(reversed(path))
+
+    def report(self, run: dict) -> dict:
+        results = run['results']
+        critical_path = self.critical_path(results)
+        stages = []
+        for name in self.order:
+            result = results[name]
+            stages.append({'stage': name, 'status': result.status, 'start': round(result.start - run['start'], 3), 'duration': round(result.end - result.start, 3), 'critical': result in critical_path})
+        return {
+            'wallTime': round(run['end'] - run['start'], 3),
+            'sumOfStageTimes': round(sum(s['duration'] for s in stages), 3),
+            'criticalPath': [r.name for r in critical_path],
+            'criticalPathTime': round(sum(r.end - r.start for r in critical_path), 3),
+            'stages': stages,
+        }
+
+def print_report(report: dict):
+    print('{0:<24} {1:<10} {2:>9} {3:>9}'.format('stage', 'status', 'start', 'duration'))
+    for stage in report['stages']:
+        print('{0:<24} {1:<10} {2:>9.3f} {3:>9.3f}{4}'.format(stage['stage'], stage['status'], stage['start'], stage['duration'], ' *' if stage['critical'] else ''))
+    print('Wall time: {0:.3f}s (sum of stage times: {1:.3f}s)'.format(report['wallTime'], report['sumOfStageTimes']))
+    print('Critical path ({0:.3f}s): {1}'.format(report['criticalPathTime'], ' -> '.join(report['criticalPath'])))
+
+# Pipeline stages
+
+class PipelineConfig:
+    def __init__(self, args):
+        self.github_repo = args.github_repo
+        self.update_data_repo = args.update_data_repo
+        self.branch = args.branch
+        self.data_directory = os.path.abspath(args.datadir)
+        self.ghpages_directory = os.path.abspath(args.ghpages)
+        self.ghpages_url = args.ghpages_url
+        self.compat_rules = args.compatrules
+        self.git_mirror = args.gitmirror
+        self.domain = args.domain
+        self.lobby_server = args.lobby_server
+        self.lobby_port = args.lobby_port
+        self.forced_files = args.force or []
+        self.push = args.push
+        self.unsigned = args.unsigned
+        self.github_token = os.getenv("GITHUB_TOKEN", default=None)
+        self.github = GitHubAPIClient(self.github_token, os.getenv("GITHUB_API_CACHE_DIR", default=None))
+
+    def path(self, *parts) -> str:
+        return os.path.sep.join([self.data_directory] + list(parts))
+
+def write_json(path: str, value, minify = False):
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if minify:
+            json.dump(value, f, ensure_ascii=False, separators=(',', ':'))
+            f.write('\n')
+        else:
+            json.dump(value, f, ensure_ascii=False, indent=2)
+
+# Never printed (see: run_command)
+SECRET_ENVIRONMENT_VARIABLES = ['GITHUB_TOKEN', 'SIGNJSON_B64_SECRETKEY', 'WZ2100_UPDATES_PUSH_TOKEN', 'CLOUDFLARE_WZ2100_CACHEPURGE_TOKEN', 'LOBBY_SERVER_INFORM_PASS']
+
+def redact_secrets(text: str) -> str:
+    for name in SECRET_ENVIRONMENT_VARIABLES:
+        value = os.getenv(name)
+        if value:
+            text = text.replace(value, '***')
+    return text
+
+def run_command(args: list, cwd = None, env = None):
+    print(' $ {0}'.format(redact_secrets(' '.join(args))))
+    subprocess.run(args, cwd=cwd, env=env, check=True)
+
+def stage_fetch_latest_release(config: PipelineConfig) -> dict:
+    latestrelease = config.github.get_json('/repos/{0}/releases/latest'.format(config.github_repo))
+    write_json(config.path('github_releases', 'latest.json'), latestrelease)
+    return {'latestrelease': latestrelease}
+
+def stage_fetch_release_list(config: PipelineConfig) -> dict:
+    releaselist = config.github.get_json('/repos/{0}/releases'.format(config.github_repo))
+    write_json(config.path('github_releases', 'index.json'), releaselist)
+    return {'releaselist': releaselist}
+
+def stage_discover_dev_commit(config: PipelineConfig) -> dict:
+    latestdevcommit = process_latest_successful_commit(config.github, config.github_repo, config.branch)
+    if latestdevcommit is None:
+        raise PipelineError('Unable to find a {0} commit that has passed checks'.format(config.branch))
+    write_json(config.path('master_branch', 'latest_successful_commit.json'), latestdevcommit)
+    return {'latestdevcommit': latestdevcommit}
+
+def stage_gen_updates(config: PipelineConfig, latestrelease: dict, releaselist: list, latestdevcommit: dict) -> dict:
+    return {'updates': gen_updates_file(latestrelease, releaselist, latestdevcommit)}
+
+def stage_gen_compat(config: PipelineConfig, latestrelease: dict, releaselist: list, latestdevcommit: dict) -> dict:
+    return {'compat': gen_compat_file(latestrelease, releaselist, latestdevcommit, load_compat_rules(config.compat_rules))}
+
+def stage_minify(config: PipelineConfig, updates: dict, compat: dict) -> dict:
+    generated_files = []
+    for filename, document in [('wz2100.json', updates), ('wz2100_compat.json', compat)]:
+        output_path = config.path('generated', filename)
+        write_json(output_path, document, minify=True)
+        generated_files.append(output_path)
+    return {'generatedfiles': generated_files}
+
+def stage_hash_signjson_source(config: PipelineConfig) -> dict:
+    # Only the source digest is an input of compile_signjson, so it is re-built only when the source changes
+    source_directory = os.path.join(os.path.dirname(CI_DIRECTORY), 'signjson')
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(source_directory):
+        dirs[:] = sorted(d for d in dirs if d != '.git')
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            digest.update(os.path.relpath(file_path, source_directory).encode('utf-8'))
+            with open(file_path, 'rb') as f:
+                digest.update(f.read())
+    return {'signjsonsource': {'path': source_directory, 'digest': digest.hexdigest()}}
+
+def stage_compile_signjson(config: PipelineConfig, signjsonsource: dict) -> dict:
+    install_directory = config.path('signjson')
+    build_directory = config.path('signjson', 'build')
+    Path(build_directory).mkdir(parents=True, exist_ok=True)
+    run_command(['cmake', '-DCMAKE_BUILD_TYPE=RelWithDebInfo', '-DCMAKE_INSTALL_PREFIX:PATH={0}'.format(install_directory), signjsonsource['path']], cwd=build_directory)
+    run_command(['cmake', '--build', '.', '--target', 'install'], cwd=build_directory)
+    return {'signjson': os.path.join(install_directory, 'bin', 'signjson')}
+
+def stage_sign(config: PipelineConfig, generatedfiles: list, signjson: str) -> dict:
+    if config.unsigned:
+        print('Not signing generated files (--unsigned)')
+        return {'signedfiles': generatedfiles}
+    secret_key = os.getenv("SIGNJSON_B64_SECRETKEY", default=None)
+    if not secret_key:
+        raise PipelineError('SIGNJSON_B64_SECRETKEY environment variable is not set')
+    if not os.path.exists(signjson):
+        raise PipelineError('signjson tool does not exist: {0}'.format(signjson))
+    for file_path in generatedfiles:
+        print('Signing {0}'.format(os.path.basename(file_path)))
+        subprocess.run([signjson, '-k', secret_key, file_path], check=True)
+    return {'signedfiles': generatedfiles}
+
+def stage_checkout_ghpages(config: PipelineConfig) -> dict:
+    if os.path.isdir(os.path.join(config.ghpages_directory, '.git')):
+        print('Using existing gh-pages checkout: {0}'.format(config.ghpages_directory))
+    else:
+        run_command(['git', 'clone', '--branch', 'gh-pages', '--single-branch', config.ghpages_url, config.ghpages_directory])
+    return {'ghpagesdir': config.ghpages_directory}
+
+def stage_resolve_netcode(config: PipelineConfig, latestrelease: dict, releaselist: list, ghpagesdir: str) -> dict:
+    # The netcode version cache is stored in the gh-pages branch (_data/net_ver)
+    versions = get_releases_netcodeVersions(latestrelease, releaselist, os.path.join(ghpagesdir, '_data'), config.path('tmp'), git_mirror_path=config.git_mirror)
+    return {'netcodeversions': [[version.VerMajor, version.VerMinor] for version in versions]}
+
+def stage_gen_lobby(config: PipelineConfig, latestrelease: dict, releaselist: list, latestdevcommit: dict, netcodeversions: list) -> dict:
+    release_versions = [NetcodeVer(major, minor) for major, minor in netcodeversions]
+    lobby = gen_lobby_file(latestrelease, releaselist, latestdevcommit, release_versions)
+    output_path = config.path('generated', 'lobby.json')
+    write_json(output_path, lobby)
+    return {'lobbyfile': output_path}
+
+def load_filtered(file_path: str):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    return {key: value for key, value in document.items() if key not in FILTERED_KEYS}
+
+def stage_diff(config: PipelineConfig, signedfiles: list, lobbyfile: str, ghpagesdir: str) -> dict:
+    changed = []
+    for new_file, published_name in [(f, os.path.basename(f)) for f in signedfiles] + [(lobbyfile, 'wzlobby.json')]:
+        existing_file = os.path.join(ghpagesdir, published_name)
+        if published_name in config.forced_files:
+            print('Forced refresh: {0}'.format(published_name))
+        elif os.path.exists(existing_file) and load_filtered(new_file) == load_filtered(existing_file):
+            print('Skipping copy of newly-generated file (content is equal): {0}'.format(published_name))
+            continue
+        changed.append([new_file, published_name])
+    if not changed:
+        return SKIPPED
+    return {'changedfiles': changed}
+
+def stage_copy(config: PipelineConfig, changedfiles: list, ghpagesdir: str) -> dict:
+    for new_file, published_name in changedfiles:
+        print('Copying newly-generated file: {0}'.format(published_name))
+        shutil.copyfile(new_file, os.path.join(ghpagesdir, published_name))
+    return {'copiedfiles': [published_name for new_file, published_name in changedfiles]}
+
+def stage_publish(config: PipelineConfig, copiedfiles: list, ghpagesdir: str) -> dict:
+    run_command(['git', 'add', '-A'], cwd=ghpagesdir)
+    if subprocess.run(['git', 'diff', '--cached', '--quiet'], cwd=ghpagesdir).returncode == 0:
+        return SKIPPED
+    run_command(['git', '-c', 'user.name=wzdev-ci', '-c', 'user.email=61424532+wzdev-ci@users.noreply.github.com', 'commit', '-m', 'Generate wz2100 json: {0}'.format(time.strftime('%a %b %d %H:%M:%S UTC %Y', time.gmtime()))], cwd=ghpagesdir)
+    commit_sha = subprocess.run(['git', 'rev-parse', '--verify', 'HEAD'], cwd=ghpagesdir, check=True, capture_output=True, text=True).stdout.strip()
+    changed_paths = subprocess.run(['git', 'diff-tree', '--no-commit-id', '--name-only', '-r', '-z', 'HEAD'], cwd=ghpagesdir, check=True, capture_output=True, text=True).stdout.split('\0')
+    if not config.push:
+        print('Not pushing gh-pages commit {0} (--no-push)'.format(commit_sha))
+        return SKIPPED
+    # The token is passed to git through the environment (as an http.extraheader config value) - so it is never part of
+    # the printed command line, or stored in the checkout's config
+    # (WZ2100_UPDATES_PUSH_TOKEN is a "user:token" pair - a bare token is sent with the x-access-token user)
+    push_credentials = os.getenv("WZ2100_UPDATES_PUSH_TOKEN", default='')
+    if not ':' in push_credentials:
+        push_credentials = 'x-access-token:' + push_credentials
+    env = dict(os.environ)
+    env['GIT_CONFIG_COUNT'] = '1'
+    env['GIT_CONFIG_KEY_0'] = 'http.https://github.com/.extraheader'
+    env['GIT_CONFIG_VALUE_0'] = 'AUTHORIZATION: basic {0}'.format(base64.b64encode(push_credentials.encode('utf-8')).decode('ascii'))
+    run_command(['git', 'push', 'https://github.com/{0}.git'.format(config.update_data_repo), 'gh-pages:gh-pages'], cwd=ghpagesdir, env=env)
+    return {'publishedcommit': commit_sha, 'changedpaths': [p for p in changed_paths if p]}
+
+def stage_wait_deployment(config: PipelineConfig, publishedcommit: str) -> dict:
+    # Poll until the GitHub Pages deployment of the pushed commit has finished
+    # Deployments change constantly - don't go through the response cache
+    # (one client for all of the polls, so the pooled keep-alive connection is re-used)
+    client = GitHubAPIClient(config.github_token)
+    try:
+        deployment_id = None
+        for attempt in range(16):
+            time.sleep(attempt * attempt)
+            try:
+                deployments = client.get_json('/repos/{0}/deployments'.format(config.update_data_repo))
+            except GitHubAPIError as e:
+                print('Failed to fetch deployments: {0}'.format(str(e)))
+                continue
+            matching = [d for d in deployments if d.get('sha') == publishedcommit and d.get('environment') == 'github-pages']
+            if matching:
+                deployment_id = matching[0]['id']
+                break
+        if deployment_id is None:
+            raise PipelineError('Failed to find matching deployment for: {0}'.format(publishedcommit))
+        print('Found deployment ID: {0}'.format(deployment_id))
+        for attempt in range(13):
+            time.sleep(attempt * attempt)
+            try:
+                statuses = client.get_json('/repos/{0}/deployments/{1}/statuses'.format(config.update_data_repo, deployment_id))
+            except GitHubAPIError as e:
+                print('Failed to fetch deployment statuses: {0}'.format(str(e)))
+                continue
+            states = [s['state'] for s in statuses if s.get('environment') == 'github-pages' and s.get('state') in ('success', 'error', 'failure')]
+            if states:
+                if states[0] != 'success':
+                    raise PipelineError('Deployment did not appear to succeed? (state: {0})'.format(states[0]))
+                time.sleep(10)
+                return {'deploymentid': deployment_id}
+        raise PipelineError('Deployment did not finish before timeout')
+    finally:
+        client.close()
+
+def stage_purge(config: PipelineConfig, changedpaths: list, deploymentid: int) -> dict:
+    changed_paths_file = config.path('tmp', 'changedpaths.txt')
+    Path(os.path.dirname(changed_paths_file)).mkdir(parents=True, exist_ok=True)
+    with open(changed_paths_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(changedpaths) + '\n')
+    urllist = generatePurgeURLsList(changed_paths_file, config.domain)
+    cloudflare_api_url = os.getenv("CLOUDFLARE_API_URL", default='https://api.cloudflare.com/client/v4').rstrip('/')
+    headers = {'Authorization': 'Bearer ' + os.getenv("CLOUDFLARE_WZ2100_CACHEPURGE_TOKEN", default=''), 'Content-Type': 'application/json'}
+    purge_url = '{0}/zones/{1}/purge_cache'.format(cloudflare_api_url, os.getenv("CLOUDFLARE_WZ2100_ZONE", default=''))
+    # Re-use one (pooled keep-alive) connection for all of the batches
+    pool = ConnectionPool()
+    try:
+        for i in range(0, len(urllist), MAX_URLS_PER_BATCH):
+            response, body = pool.request('POST', purge_url, headers, json.dumps({'files': urllist[i:i + MAX_URLS_PER_BATCH]}).encode('utf-8'))
+            print('Purge batch {0}: {1}'.format(i // MAX_URLS_PER_BATCH + 1, response.status))
+            if response.status != 200:
+                raise PipelineError('Cloudflare cache purge failed ({0}): {1}'.format(response.status, body.decode('utf-8', 'ignore')))
+    finally:
+        pool.close()
+    return {'purgedurls': urllist}
+
+def stage_inform_lobby(config: PipelineConfig, copiedfiles: list, deploymentid: int) -> dict:
+    if 'wzlobby.json' not in copiedfiles:
+        return SKIPPED
+    time.sleep(10)
+    sendLobbyCommand(config.lobby_server, config.lobby_port, os.getenv("LOBBY_SERVER_INFORM_COMMAND", default=''), os.getenv("LOBBY_SERVER_INFORM_PASS", default=''))
+    return {'lobbyinformed': True}
+
+PIPELINE_STAGES = [
+    Stage('fetch_latest_release', stage_fetch_latest_release, (), {'latestrelease': dict}),
+    Stage('fetch_release_list', stage_fetch_release_list, (), {'releaselist': list}),
+    Stage('discover_dev_commit', stage_discover_dev_commit, (), {'latestdevcommit': dict}),
+    Stage('gen_updates', stage_gen_updates, ('latestrelease', 'releaselist', 'latestdevcommit'), {'updates': dict}),
+    Stage('gen_compat', stage_gen_compat, ('latestrelease', 'releaselist', 'latestdevcommit'), {'compat': dict}),
+    Stage('minify', stage_minify, ('updates', 'compat'), {'generatedfiles': list}),
+    Stage('hash_signjson_source', stage_hash_signjson_source, (), {'signjsonsource': dict}),
+    Stage('compile_signjson', stage_compile_signjson, ('signjsonsource',), {'signjson': str}, memoize=True, reusable=lambda config, outputs: os.path.exists(outputs['signjson'])),
+    Stage('sign', stage_sign, ('generatedfiles', 'signjson'), {'signedfiles': list}),
+    Stage('checkout_ghpages', stage_checkout_ghpages, (), {'ghpagesdir': str}),
+    Stage('resolve_netcode', stage_resolve_netcode, ('latestrelease', 'releaselist', 'ghpagesdir'), {'netcodeversions': list}),
+    Stage('gen_lobby', stage_gen_lobby, ('latestrelease', 'releaselist', 'latestdevcommit', 'netcodeversions'), {'lobbyfile': str}),
+    Stage('diff', stage_diff, ('signedfiles', 'lobbyfile', 'ghpagesdir'), {'changedfiles': list}),
+    Stage('copy', stage_copy, ('changedfiles', 'ghpagesdir'), {'copiedfiles': list}),
+    Stage('publish', stage_publish, ('copiedfiles', 'ghpagesdir'), {'publishedcommit': str, 'changedpaths': list}),
+    Stage('wait_deployment', stage_wait_deployment, ('publishedcommit',), {'deploymentid': int}),
+    Stage('purge', stage_purge, ('changedpaths', 'deploymentid'), {'purgedurls': list}),
+    Stage('inform_lobby', stage_inform_lobby, ('copiedfiles', 'deploymentid'), {'lobbyinformed': bool}),
+]
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run the update pipeline as a concurrent dependency graph of stages')
+    parser.add_argument('datadir', type=str, help='working directory for fetched / generated data')
+    parser.add_argument('ghpages', type=str, help='gh-pages branch checkout (cloned from --ghpages-url if it does not exist)')
+    parser.add_argument('--ghpages-url', type=str, default='https://github.com/Warzone2100/update-data.git')
+    parser.add_argument('--github-repo', type=str, default='Warzone2100/warzone2100')
+    parser.add_argument('--update-data-repo', type=str, default='Warzone2100/update-data')
+    parser.add_argument('--branch', type=str, default='master')
+    parser.add_argument('-c', '--compatrules', type=str, default=DEFAULT_COMPAT_RULES_FILEPATH)
+    parser.add_argument('-g', '--gitmirror', type=str, default=None, help='local (bare) mirror of the game repository, used to resolve netcode versions before downloading source tarballs')
+    parser.add_argument('--domain', type=str, default='data.wz2100.net')
+    parser.add_argument('--lobby-server', type=str, default='lobby.wz2100.net')
+    parser.add_argument('--lobby-port', type=int, default=9990)
+    parser.add_argument('--force', type=str, action='append', help='published file to refresh even if its content is unchanged')
+    parser.add_argument('--no-push', dest='push', action='store_false', help='commit to the gh-pages checkout, but do not push (or purge / inform the lobby)')
+    parser.add_argument('--unsigned', action='store_true', help='do not sign the generated files')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='maximum number of concurrently running stages')
+    parser.add_argument('--state', type=str, default=None, help='state file (memoized stage outputs) to read and update')
+    parser.add_argument('--report', type=str, default=None, help='write the timing report to this JSON file')
+    args = parser.parse_args(argv)
+
+    previous_state = {}
+    if args.state and os.path.exists(args.state):
+        with open(args.state, 'r') as state_file:
+            previous_state = json.load(state_file)
+
+    pipeline = Pipeline(PIPELINE_STAGES)
+    config = PipelineConfig(args)
+    try:
+        run = pipeline.run(config, args.jobs, previous_state)
+    finally:
+        config.github.close()
+
+    report = pipeline.report(run)
+    print_report(report)
+    print('GitHub API requests: {0}'.format(config.github.stats))
+    if args.report:
+        write_json(args.report, report)
+    if args.state:
+        write_json(args.state, run['state'])
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
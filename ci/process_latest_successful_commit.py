@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+#
+# Find the latest commit on a branch that has passed its (GitHub Actions) checks, and write its info
+# (plus the commit count of its history, and the shas of the supported development builds - the commit
+# and the commits before it) to: latest_successful_commit.json
+#
+# All requests (commit list pages, check runs, GraphQL) are made through one GitHubAPIClient, so pooled
+# keep-alive connections are re-used, and conditional requests are made against the response cache
+# (if GITHUB_API_CACHE_DIR is set).
+#
+# Expects the following environment variables to be set:
+# GITHUB_REPOSITORY = "org/repo"
+# BRANCH = "master"
+# GITHUB_TOKEN
+#
+# Optionally (for example, to point at a local replay server):
+# GITHUB_API_URL = "https://api.github.com"
+# GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+# GITHUB_API_CACHE_DIR = persistent GitHub API response cache directory (see: github_api.py)
+
+import sys
+import json
+import os
+
+from github_api import GitHubAPIClient
+from generate_lobby_json import SUPPORTED_DEV_BUILDS_NUM
+
+MAX_COMMIT_PAGES = 5
+FILTERED_SLUGS = ['cirrus-ci', 'travis-ci']
+DESIRED_SLUGS = ['github-actions']
+CHECK_RUNS_ACCEPT = 'application/vnd.github.antiope-preview+json'
+
+def get_commits_page(client: GitHubAPIClient, repository: str, branch: str, page: int) -> list:
+    page_query = '&page={0}'.format(page) if page > 1 else ''
+    return client.get_json('/repos/{0}/commits?sha={1}{2}'.format(repository, branch, page_query))
+
+def commit_passed_checks(client: GitHubAPIClient, repository: str, commit_sha: str) -> bool:
+    # Get list of check runs for the commit
+    check_runs = client.get_json('/repos/{0}/commits/{1}/check-runs'.format(repository, commit_sha), CHECK_RUNS_ACCEPT)
+
+    # Verify that this contains check runs
+    check_count = check_runs.get('total_count')
+    if not isinstance(check_count, int):
+        return False
+    if not check_count > 1:
+        print('  - Commit did not return any check runs - skipping')
+        return False
+
+    # Check runs for the commit that have completed and were successful
+    successful_check_runs = [run for run in check_runs.get('check_runs', []) if not run['app']['slug'] in FILTERED_SLUGS and run['status'] == 'completed' and run['conclusion'] == 'success']
+
+    # Verify that some checks with specified slugs have completed
+    num_desired_check_runs = len([run for run in successful_check_runs if run['app']['slug'] in DESIRED_SLUGS])
+    if num_desired_check_runs > 1:
+        print('  - Desired check runs that have completed successfully: {0}'.format(num_desired_check_runs))
+        return True
+    return False
+
+def find_latest_successful_commit(client: GitHubAPIClient, repository: str, branch: str):
+    # Returns: (commit info, the shas of the commit and the commits before it - up to SUPPORTED_DEV_BUILDS_NUM)
+    for page in range(1, MAX_COMMIT_PAGES + 1):
+        print('----------')
+        print('Fetching page {0} of commits for {1} branch of: {2}'.format(page, branch, repository))
+        page_commits = get_commits_page(client, repository, branch, page)
+        for index, commit in enumerate(page_commits):
+            print('- Processing: {0}'.format(commit['sha']))
+            if commit_passed_checks(client, repository, commit['sha']):
+                print('  - Found commit: {0}'.format(commit['sha']))
+                recent_commits = page_commits[index:]
+                next_page = page + 1
+                while len(recent_commits) < SUPPORTED_DEV_BUILDS_NUM and page_commits:
+                    page_commits = get_commits_page(client, repository, branch, next_page)
+                    recent_commits = recent_commits + page_commits
+                    next_page += 1
+                return commit, [c['sha'] for c in recent_commits[:SUPPORTED_DEV_BUILDS_NUM]]
+        if not page_commits:
+            break
+    return None, []
+
+def get_commit_history_count(client: GitHubAPIClient, commit_node_id: str) -> int:
+    query = '{ node(id: "%s") { ... on Commit { id, oid, url, history(first: 0) { totalCount } } } }' % commit_node_id
+    node_info = client.graphql(query)
+    return node_info['data']['node']['history']['totalCount']
+
+def process_latest_successful_commit(client: GitHubAPIClient, repository: str, branch: str) -> dict:
+    commit, recent_commits = find_latest_successful_commit(client, repository, branch)
+    if commit is None:
+        return None
+    print('Latest commit that has passed checks: {0}'.format(commit['sha']))
+    print('LATEST_COMMIT_NODE_ID={0}'.format(commit['node_id']))
+    commit_count = get_commit_history_count(client, commit['node_id'])
+    print('LATEST_COMMIT_COUNT={0}'.format(commit_count))
+    latestdevcommit = dict(commit)
+    latestdevcommit['wz_history'] = {'commit_count': str(commit_count), 'recent_commits': recent_commits}
+    return latestdevcommit
+
+def main(argv):
+    for name in ['GITHUB_REPOSITORY', 'BRANCH', 'GITHUB_TOKEN']:
+        if not os.getenv(name):
+            print('- {0} environment variable is not set'.format(name))
+            sys.exit(1)
+
+    client = GitHubAPIClient(os.getenv("GITHUB_TOKEN"), os.getenv("GITHUB_API_CACHE_DIR", default=None))
+    try:
+        latestdevcommit = process_latest_successful_commit(client, os.getenv("GITHUB_REPOSITORY"), os.getenv("BRANCH"))
+    finally:
+        client.close()
+    if latestdevcommit is None:
+        print('- Unable to find commit that has passed checks')
+        sys.exit(1)
+
+    with open('latest_successful_commit.json', 'w', encoding='utf-8') as f:
+        json.dump(latestdevcommit, f, ensure_ascii=False, indent=2)
+    print('GitHub API requests: {0}'.format(client.stats))
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
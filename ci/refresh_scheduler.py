@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+#
+# Determine which of the published data files actually need to be refreshed (regenerated + re-signed + purged)
+#
+# A published file needs a refresh when either:
+# - its validThru is about to expire (at the last scheduled check before validThru minus a safety margin), or
+# - a release grace window has rolled over since it was generated (which changes the generated content)
+#
+# A rollover that is handled by a check before the expiry deadline also covers that deadline (the refresh
+# resets validThru), so each file is refreshed about once a day. Scheduled checks are assumed to run every
+# check interval, aligned to UTC midnight (i.e. cron: '0 * * * *' for hourly checks).
+#
+# When any file is due, every file that would become due before the next check is refreshed with it (so one
+# run pushes + purges them together) - as is every file that would otherwise become due (expire) before the
+# next rollover of any file, which keeps the files' expiry refreshes in phase with the rollover refreshes.
+#
+# The output JSON lists the files that are due now, and when the next refresh will be required
+
+import sys
+import argparse
+import json
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from generate_updates_json import MS_STORE_RELEASE_GRACE_DAYS, VALID_THRU_HOURS, get_prior_stable_releases, convert_github_json_date_to_datetime
+from generate_lobby_json import STABLE_RELEASE_GRACE_DAYS
+
+# The refresh must be started at least this long before validThru (the time the scheduled check may be delayed,
+# plus the time to generate + publish + purge). Files generated up to REFRESH_MARGIN after a check are then
+# refreshed at the same check time each day.
+REFRESH_MARGIN = timedelta(hours=1)
+
+# grace_days: the grace window (if any) used when generating the file
+# daily_rollover: whether the generated content changes at each UTC midnight
+PublishedFile = namedtuple('PublishedFile', 'name grace_days daily_rollover')
+
+# current: when the published file next needs a refresh
+# next_rollover: the first check after now at which the file's content changes (if any)
+RefreshTimes = namedtuple('RefreshTimes', 'current next_rollover')
+
+PUBLISHED_FILES = [
+    PublishedFile('wz2100.json', MS_STORE_RELEASE_GRACE_DAYS, False),
+    # the compat notice ids for older releases embed the current UTC date
+    PublishedFile('wz2100_compat.json', None, True),
+    PublishedFile('wzlobby.json', STABLE_RELEASE_GRACE_DAYS, False),
+]
+
+def parse_valid_thru(document: dict):
+    valid_thru = document.get('validThru')
+    if valid_thru is None:
+        return None
+    return datetime.fromisoformat(valid_thru).astimezone(timezone.utc).replace(tzinfo=None)
+
+def get_grace_rollovers(latestgithubrelease: dict, releaselist: list, grace_days: int) -> list:
+    # (now - published_at).days <= grace_days flips to False once grace_days + 1 full days have passed
+    releases = [latestgithubrelease] + get_prior_stable_releases(latestgithubrelease, releaselist)
+    rollovers = []
+    for release in releases:
+        try:
+            rollovers.append(convert_github_json_date_to_datetime(release['published_at']) + timedelta(days=grace_days + 1))
+        except (KeyError, ValueError) as e:
+            print("Failed to parse published_at for release {0}: {1}".format(release.get('tag_name'), str(e)))
+    return sorted(rollovers)
+
+def get_next_daily_rollover(after: datetime) -> datetime:
+    return datetime(after.year, after.month, after.day) + timedelta(days=1)
+
+def get_check_time_at_or_before(time: datetime, check_interval: timedelta) -> datetime:
+    # Scheduled checks run every check_interval (aligned to UTC midnight)
+    day = datetime(time.year, time.month, time.day)
+    return day + ((time - day) // check_interval) * check_interval
+
+def get_check_time_at_or_after(time: datetime, check_interval: timedelta) -> datetime:
+    check_time = get_check_time_at_or_before(time, check_interval)
+    if check_time < time:
+        check_time += check_interval
+    return check_time
+
+def get_rollover_check_times(published: PublishedFile, latestgithubrelease: dict, releaselist: list, after: datetime, check_interval: timedelta) -> list:
+    # The checks at which the rollovers after the specified time are handled
+    rollovers = []
+    if not published.grace_days is None:
+        rollovers.extend(r for r in get_grace_rollovers(latestgithubrelease, releaselist, published.grace_days) if r > after)
+    if published.daily_rollover:
+        rollovers.append(get_next_daily_rollover(after))
+    return [get_check_time_at_or_after(r, check_interval) for r in rollovers]
+
+def get_refresh_time(published: PublishedFile, document: dict, latestgithubrelease: dict, releaselist: list, now: datetime, check_interval: timedelta) -> datetime:
+    valid_thru = parse_valid_thru(document)
+    if valid_thru is None:
+        # Unknown generation time - only rollovers since the last check (or later) are relevant
+        generated_at = now - check_interval
+        deadline = None
+    else:
+        generated_at = valid_thru - timedelta(hours=VALID_THRU_HOURS)
+        deadline = valid_thru - REFRESH_MARGIN
+    refresh_times = get_rollover_check_times(published, latestgithubrelease, releaselist, generated_at, check_interval)
+    if not deadline is None:
+        if not refresh_times or min(refresh_times) > deadline:
+            # No rollover refresh before the deadline - refresh at the last check before it
+            refresh_times.append(get_check_time_at_or_before(deadline, check_interval))
+    if not refresh_times:
+        return None
+    return min(refresh_times)
+
+def get_due_files(schedule: dict, now: datetime, check_interval: timedelta) -> list:
+    # If any file is due, include every file that would become due before the next check - or before the
+    # next rollover of any file (which would otherwise require a separate refresh)
+    if not any(times.current <= now for times in schedule.values() if not times.current is None):
+        return []
+    next_check = now + check_interval
+    next_rollovers = [times.next_rollover for times in schedule.values() if not times.next_rollover is None]
+    next_rollover = min(next_rollovers) if next_rollovers else None
+    due_files = []
+    for name, times in schedule.items():
+        if times.current is None:
+            continue
+        if times.current < next_check or next_rollover is None or times.current < next_rollover:
+            due_files.append(name)
+    return due_files
+
+def get_refresh_schedule(published_directory: str, latestgithubrelease: dict, releaselist: list, now: datetime, check_interval: timedelta) -> dict:
+    schedule = {}
+    for published in PUBLISHED_FILES:
+        next_rollovers = [t for t in get_rollover_check_times(published, latestgithubrelease, releaselist, now, check_interval) if t > now]
+        next_rollover = min(next_rollovers) if next_rollovers else None
+        published_path = os.path.sep.join([published_directory, published.name])
+        try:
+            with open(published_path, 'r') as published_file:
+                document = json.load(published_file)
+        except FileNotFoundError:
+            # Not yet published - always due
+            print('Published file does not exist: {0}'.format(published_path))
+            schedule[published.name] = RefreshTimes(now, next_rollover)
+            continue
+        schedule[published.name] = RefreshTimes(get_refresh_time(published, document, latestgithubrelease, releaselist, now, check_interval), next_rollover)
+    return schedule
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Determine which published data files need to be refreshed')
+    parser.add_argument('publisheddir', type=str, help='directory containing the published files (i.e. the gh-pages branch)')
+    parser.add_argument('-r', '--latestrelease', type=str, required=True)
+    parser.add_argument('-i', '--releaselist', type=str, required=True)
+    parser.add_argument('-o', '--output', type=str, required=True)
+    parser.add_argument('--interval-hours', type=float, default=1.0, help='time between scheduled checks')
+    args = parser.parse_args(argv)
+
+    print ('publisheddir is:', args.publisheddir)
+    print ('latestrelease filepath file is:', args.latestrelease)
+    print ('releaselist filepath file is:', args.releaselist)
+
+    with open(args.latestrelease, 'r') as release_file, open(args.releaselist, 'r') as releaselist_file:
+        latestrelease = json.load(release_file)
+        releaselist = json.load(releaselist_file)
+
+    now = datetime.utcnow()
+    check_interval = timedelta(hours=args.interval_hours)
+    schedule = get_refresh_schedule(args.publisheddir, latestrelease, releaselist, now, check_interval)
+
+    due_files = get_due_files(schedule, now, check_interval)
+    pending_times = []
+    for name, times in schedule.items():
+        refresh_time = times.current
+        if refresh_time is None:
+            print('{0}: no refresh required'.format(name))
+        elif refresh_time <= now:
+            print('{0}: refresh due (since {1})'.format(name, refresh_time.isoformat()))
+        elif name in due_files:
+            print('{0}: refresh due at {1} (refreshed now, with the other due files)'.format(name, refresh_time.isoformat()))
+        else:
+            print('{0}: next refresh at {1}'.format(name, refresh_time.isoformat()))
+            pending_times.append(refresh_time)
+
+    output = {'dueFiles': due_files}
+    if pending_times:
+        output['nextRefresh'] = min(pending_times).replace(microsecond=0, tzinfo=timezone.utc).isoformat()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
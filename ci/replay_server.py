@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+#
+# Record / replay HTTP server for running the update pipeline offline
+#
+# Requests are routed by the first path component to a named upstream, so (for example):
+#   GITHUB_API_URL=http://127.0.0.1:8088/github
+#   GITHUB_GRAPHQL_URL=http://127.0.0.1:8088/github/graphql
+#
+# In record mode, requests are forwarded to the real upstream and the responses are saved
+# into the fixture directory. In replay mode (the default), the saved responses are served
+# back, optionally with added latency and injected failures.
+#
+# A lobby server stand-in can also be started (--lobby-port), which accepts inform_lobby.py
+# commands and replies like the lobby server does (the real lobby server is never contacted).
+
+import sys
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import socketserver
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_UPSTREAMS = {
+    'github': 'https://api.github.com',
+    'cloudflare': 'https://api.cloudflare.com/client/v4',
+}
+
+# Response headers that are stored in (and served from) fixtures
+RECORDED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Link']
+
+# Accept headers that request the default (JSON) representation - curl sends "*/*", github_api.py sends
+# "application/vnd.github+json" - so a fixture recorded through either client can be replayed for the other
+DEFAULT_REPRESENTATION_ACCEPTS = ['', '*/*', 'application/json', 'application/vnd.github+json', 'application/vnd.github.v3+json']
+
+class ReplayConfig:
+    def __init__(self, fixture_dir: str, upstreams: dict, record: bool = False, latency_ms: int = 0, fail_rate: float = 0.0, fail_status: int = 502, seed = None):
+        self.fixture_dir = fixture_dir
+        self.upstreams = upstreams
+        self.record = record
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        if self.fail_rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < self.fail_rate
+
+def normalize_accept(accept: str) -> str:
+    accept = ','.join(media_range.strip() for media_range in (accept or '').lower().split(','))
+    if accept in DEFAULT_REPRESENTATION_ACCEPTS:
+        return ''
+    return accept
+
+def get_fixture_path(fixture_dir: str, upstream: str, method: str, path: str, accept: str, body: bytes) -> str:
+    key = hashlib.sha256('\n'.join([method, path, normalize_accept(accept), hashlib.sha256(body).hexdigest()]).encode('utf-8')).hexdigest()
+    return os.path.sep.join([fixture_dir, 'http', upstream, key[:24] + '.json'])
+
+def save_fixture(fixture_path: str, request_info: dict, status: int, headers: dict, body: bytes):
+    Path(os.path.dirname(fixture_path)).mkdir(parents=True, exist_ok=True)
+    response = {'status': status, 'headers': headers}
+    try:
+        response['body'] = body.decode('utf-8')
+    except UnicodeDecodeError:
+        response['body_base64'] = base64.b64encode(body).decode('ascii')
+    with open(fixture_path, 'w', encoding='utf-8') as f:
+        json.dump({'request': request_info, 'response': response}, f, ensure_ascii=False, indent=2)
+
+def load_fixture(fixture_path: str):
+    with open(fixture_path, 'r', encoding='utf-8') as f:
+        response = json.load(f)['response']
+    if 'body_base64' in response:
+        body = base64.b64decode(response['body_base64'])
+    else:
+        body = response.get('body', '').encode('utf-8')
+    return response['status'], response.get('headers', {}), body
+
+def make_handler(config: ReplayConfig):
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_body(self, status: int, headers: dict, body: bytes):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def send_message(self, status: int, message: str):
+            self.send_body(status, {'Content-Type': 'application/json; charset=utf-8'}, json.dumps({'message': message}).encode('utf-8'))
+
+        def local_base_url(self, upstream: str) -> str:
+            return 'http://{0}/{1}'.format(self.headers.get('Host', '{0}:{1}'.format(*self.server.server_address[:2])), upstream)
+
+        def record_request(self, upstream: str, upstream_path: str, body: bytes):
+            url = config.upstreams[upstream] + upstream_path
+            forward_request = urllib.request.Request(url, data=(body if body else None), method=self.command)
+            for name in ['Accept', 'Authorization', 'Content-Type']:
+                if name in self.headers:
+                    forward_request.add_unredirected_header(name, self.headers[name])
+            try:
+                with urllib.request.urlopen(forward_request) as response:
+                    return response.status, response.headers, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.headers, e.read()
+
+        def handle_any(self):
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length) if content_length > 0 else b''
+
+            upstream, _, upstream_path = self.path.lstrip('/').partition('/')
+            upstream_path = '/' + upstream_path
+            if upstream not in config.upstreams:
+                self.send_message(404, 'Unknown upstream: {0}'.format(upstream))
+                return
+
+            if config.latency_ms > 0:
+                time.sleep(config.latency_ms / 1000.0)
+            if config.should_fail():
+                print('! Injected failure ({0}): {1} {2}'.format(config.fail_status, self.command, self.path))
+                self.send_message(config.fail_status, 'Injected failure')
+                return
+
+            accept = self.headers.get('Accept', '')
+            fixture_path = get_fixture_path(config.fixture_dir, upstream, self.command, upstream_path, accept, body)
+            if config.record:
+                status, upstream_headers, response_body = self.record_request(upstream, upstream_path, body)
+                headers = {name: upstream_headers[name] for name in RECORDED_HEADERS if upstream_headers.get(name)}
+                request_info = {'method': self.command, 'upstream': upstream, 'path': upstream_path, 'accept': accept}
+                save_fixture(fixture_path, request_info, status, headers, response_body)
+                print('@ Recorded ({0}): {1} {2}'.format(status, self.command, self.path))
+            else:
+                try:
+                    status, headers, response_body = load_fixture(fixture_path)
+                except FileNotFoundError:
+                    print('! No fixture for: {0} {1}'.format(self.command, self.path))
+                    self.send_message(404, 'No recorded fixture for: {0} {1}'.format(self.command, self.path))
+                    return
+
+            # Point any pagination links back at this server
+            if 'Link' in headers:
+                headers = dict(headers)
+                headers['Link'] = headers['Link'].replace(config.upstreams[upstream], self.local_base_url(upstream))
+
+            # Conditional requests (see: github_api.py)
+            if not config.record:
+                etag = headers.get('ETag')
+                last_modified = headers.get('Last-Modified')
+                if (etag and self.headers.get('If-None-Match') == etag) or (last_modified and self.headers.get('If-Modified-Since') == last_modified):
+                    self.send_body(304, {name: headers[name] for name in ['ETag', 'Last-Modified'] if name in headers}, b'')
+                    return
+            self.send_body(status, headers, response_body)
+
+        do_GET = handle_any
+        do_HEAD = handle_any
+        do_POST = handle_any
+
+    return ReplayHandler
+
+class LobbyStandInHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.settimeout(5.0)
+        data = b''
+        try:
+            data = self.request.recv(4096)
+        except OSError:
+            pass
+        command = data.split(b'\0', 1)[0].decode('utf-8', 'ignore')
+        # Do not log the command data (it contains the lobby server password)
+        print('@ Lobby stand-in received command: {0} ({1} bytes)'.format(command, len(data)))
+        self.request.sendall(b'\0')
+
+def parse_upstream(value: str):
+    name, sep, url = value.partition('=')
+    if not sep or not name or not url:
+        raise argparse.ArgumentTypeError('Expected NAME=URL, got: {0}'.format(value))
+    return name, url.rstrip('/')
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Record / replay HTTP server for offline update pipeline runs')
+    parser.add_argument('fixturedir', type=str)
+    parser.add_argument('--record', action='store_true', help='forward requests to the upstreams and record the responses')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--upstream', type=parse_upstream, action='append', default=[], help='NAME=URL (in addition to: github, cloudflare)')
+    parser.add_argument('--lobby-port', type=int, default=None, help='also start a lobby server stand-in on this port')
+    parser.add_argument('--latency-ms', type=int, default=0, help='latency added to each HTTP response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of HTTP requests that fail')
+    parser.add_argument('--fail-status', type=int, default=502)
+    parser.add_argument('--seed', type=int, default=None, help='seed for failure injection (for reproducible runs)')
+    args = parser.parse_args(argv)
+
+    upstreams = dict(DEFAULT_UPSTREAMS)
+    upstreams.update(dict(args.upstream))
+    config = ReplayConfig(args.fixturedir, upstreams, args.record, args.latency_ms, args.fail_rate, args.fail_status, args.seed)
+
+    print ('fixturedir is:', args.fixturedir)
+    print ('mode is:', 'record' if args.record else 'replay')
+    for name, url in upstreams.items():
+        print ('upstream: http://{0}:{1}/{2} -> {3}'.format(args.host, args.port, name, url))
+
+    if not args.lobby_port is None:
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        lobby_server = socketserver.ThreadingTCPServer((args.host, args.lobby_port), LobbyStandInHandler)
+        threading.Thread(target=lobby_server.serve_forever, daemon=True).start()
+        print ('lobby stand-in: {0}:{1}'.format(args.host, args.lobby_port))
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    httpd.server_close()
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
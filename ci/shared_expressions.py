@@ -0,0 +1,246 @@
+# Shared sub-expression definitions for the channelConditional / buildPropertyMatch / propertyMatch
+# expressions in the generated updates.json and compat.json documents
+#
+# Operands that are repeated across a document's expressions are moved into a top-level `expressions`
+# table, and each occurrence is replaced by a reference (`@name`). A reference is evaluated like a
+# parenthesized sub-expression - so a client can evaluate each named expression (and its regexes) once
+# per document, instead of once per occurrence.
+#
+# Documents that use references are marked with `formatVersion` (older clients do not understand
+# references, so this is opt-in). Every rewritten expression is expanded back and checked to be
+# identical to the original (inline) expression.
+
+import re
+
+SHARED_EXPRESSIONS_FORMAT_VERSION = 2
+
+REFERENCE_PREFIX = '@'
+_REFERENCE_NAME_REGEX = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+# Expression properties, by the document list that contains them
+CHANNEL_EXPRESSION_KEYS = ['channelConditional']
+RELEASE_EXPRESSION_KEYS = ['buildPropertyMatch']
+COMPAT_NOTICE_EXPRESSION_KEYS = ['propertyMatch']
+
+def _skip_string_literal(expression: str, index: int) -> int:
+    # index is the position of the opening quote - returns the position after the closing quote
+    index += 1
+    while index < len(expression):
+        if expression[index] == '\\':
+            index += 2
+            continue
+        if expression[index] == '"':
+            return index + 1
+        index += 1
+    raise ValueError('Unterminated string literal in expression: {0}'.format(expression))
+
+def _strip_span(expression: str, start: int, end: int):
+    while start < end and expression[start].isspace():
+        start += 1
+    while end > start and expression[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _split_operands(expression: str, start: int, end: int) -> list:
+    # Split expression[start:end] at its top-level && / || operators - returns the (stripped) operand spans
+    operands = []
+    depth = 0
+    operand_start = start
+    index = start
+    while index < end:
+        c = expression[index]
+        if c == '"':
+            index = _skip_string_literal(expression, index)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError('Unbalanced parentheses in expression: {0}'.format(expression))
+        elif depth == 0 and expression[index:index + 2] in ('&&', '||'):
+            operands.append(_strip_span(expression, operand_start, index))
+            index += 2
+            operand_start = index
+            continue
+        index += 1
+    if depth != 0:
+        raise ValueError('Unbalanced parentheses in expression: {0}'.format(expression))
+    operands.append(_strip_span(expression, operand_start, end))
+    return operands
+
+def _group_content_span(expression: str, start: int, end: int):
+    # If expression[start:end] is a single parenthesized group (optionally negated), returns the span inside the parentheses
+    if expression[start] == '!':
+        start, _ = _strip_span(expression, start + 1, end)
+    if start >= end or expression[start] != '(' or expression[end - 1] != ')':
+        return None
+    depth = 0
+    index = start
+    while index < end:
+        c = expression[index]
+        if c == '"':
+            index = _skip_string_literal(expression, index)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0 and index != end - 1:
+                # the opening parenthesis closes before the end
+                return None
+        index += 1
+    return start + 1, end - 1
+
+def find_operand_spans(expression: str) -> list:
+    # All operands of && / || chains in the expression (at any nesting level), including the whole expression
+    spans = []
+    def visit(start: int, end: int):
+        operands = _split_operands(expression, start, end)
+        for operand_start, operand_end in operands:
+            if operand_start >= operand_end:
+                raise ValueError('Empty operand in expression: {0}'.format(expression))
+            spans.append((operand_start, operand_end))
+            group = _group_content_span(expression, operand_start, operand_end)
+            if not group is None:
+                visit(group[0], group[1])
+    visit(*_strip_span(expression, 0, len(expression)))
+    return spans
+
+def _json_string_length(s: str) -> int:
+    # (approximate) serialized length - quotes and backslashes are escaped in the JSON output
+    return len(s) + s.count('"') + s.count('\\') + 2
+
+def _sharing_savings(operand: str, count: int, name: str) -> int:
+    # bytes saved by replacing count occurrences of operand with a reference (including the definition itself)
+    occurrence_savings = count * (_json_string_length(operand) - _json_string_length(REFERENCE_PREFIX + name))
+    definition_cost = _json_string_length(name) + _json_string_length(operand) + 4
+    return occurrence_savings - definition_cost
+
+def _replace_operand(expression: str, operand: str, reference: str) -> str:
+    # Replace every (operand-position) occurrence of operand in the expression
+    spans = [span for span in find_operand_spans(expression) if expression[span[0]:span[1]] == operand]
+    # keep only the outermost, non-overlapping occurrences (replaced from the end)
+    result = expression
+    last_start = len(expression) + 1
+    for start, end in sorted(spans, reverse=True):
+        if end > last_start:
+            continue
+        result = result[:start] + reference + result[end:]
+        last_start = start
+    return result
+
+def find_shared_subexpressions(expressions: list, name_prefix: str = 'x') -> tuple:
+    # Returns: (the rewritten expressions, {name: definition}) - operands are shared greedily (largest savings first),
+    # for as long as sharing reduces the serialized size
+    expressions = list(expressions)
+    definitions = dict()
+    while True:
+        name = '{0}{1}'.format(name_prefix, len(definitions) + 1)
+        counts = dict()
+        first_seen = dict()
+        for expression in expressions:
+            for start, end in find_operand_spans(expression):
+                operand = expression[start:end]
+                if find_reference_spans(operand):
+                    # (definitions are kept inline)
+                    continue
+                counts[operand] = counts.get(operand, 0) + 1
+                first_seen.setdefault(operand, len(first_seen))
+        candidates = [(_sharing_savings(operand, count, name), -first_seen[operand], operand) for operand, count in counts.items() if count >= 2]
+        candidates = [candidate for candidate in candidates if candidate[0] > 0]
+        if not candidates:
+            break
+        _, _, operand = max(candidates)
+        definitions[name] = operand
+        expressions = [_replace_operand(expression, operand, REFERENCE_PREFIX + name) for expression in expressions]
+    return expressions, definitions
+
+def find_reference_spans(expression: str) -> list:
+    # Returns: [(start, end, name)] for each reference (outside of string literals) in the expression
+    references = []
+    index = 0
+    while index < len(expression):
+        c = expression[index]
+        if c == '"':
+            index = _skip_string_literal(expression, index)
+            continue
+        if c == REFERENCE_PREFIX:
+            match = _REFERENCE_NAME_REGEX.match(expression, index + len(REFERENCE_PREFIX))
+            if match is None:
+                raise ValueError('Invalid expression reference at position {0}: {1}'.format(index, expression))
+            references.append((index, match.end(), match.group(0)))
+            index = match.end()
+            continue
+        index += 1
+    return references
+
+def expand_expression_references(expression: str, definitions: dict) -> str:
+    # Replace each reference with the definition text
+    result = []
+    index = 0
+    for start, end, name in find_reference_spans(expression):
+        if not name in definitions:
+            raise ValueError('Unknown expression reference: {0}{1}'.format(REFERENCE_PREFIX, name))
+        result.append(expression[index:start])
+        result.append(definitions[name])
+        index = end
+    result.append(expression[index:])
+    return ''.join(result)
+
+def _document_expression_slots(document: dict):
+    # Yields: (containing dict, key) for every expression in the document
+    for channel in document.get('channels', []):
+        for key in CHANNEL_EXPRESSION_KEYS:
+            if key in channel:
+                yield channel, key
+        for release in channel.get('releases', []):
+            for key in RELEASE_EXPRESSION_KEYS:
+                if key in release:
+                    yield release, key
+        for notice in channel.get('compatNotices', []):
+            for key in COMPAT_NOTICE_EXPRESSION_KEYS:
+                if key in notice:
+                    yield notice, key
+
+def verify_shared_expressions(document: dict, original_expressions: list):
+    # Every expression must expand back to exactly the original (inline) expression, and every
+    # definition must itself be a complete (inline) expression
+    definitions = document.get('expressions', {})
+    for name, definition in definitions.items():
+        if find_reference_spans(definition):
+            raise ValueError('Shared expression {0} contains a reference: {1}'.format(name, definition))
+        find_operand_spans(definition)
+    slots = list(_document_expression_slots(document))
+    if len(slots) != len(original_expressions):
+        raise ValueError('Document has {0} expressions, expected: {1}'.format(len(slots), len(original_expressions)))
+    for (container, key), original in zip(slots, original_expressions):
+        # references may only replace complete operands (so they evaluate like the inline sub-expression)
+        operand_spans = set(find_operand_spans(container[key]))
+        for start, end, name in find_reference_spans(container[key]):
+            if not (start, end) in operand_spans:
+                raise ValueError('Reference {0}{1} is not a complete operand in: {2}'.format(REFERENCE_PREFIX, name, container[key]))
+        expanded = expand_expression_references(container[key], definitions)
+        if expanded != original:
+            raise ValueError('{0} expands to: {1}, but the inline expression is: {2}'.format(key, expanded, original))
+
+def share_document_expressions(document: dict) -> dict:
+    # Returns a copy of the document (updates.json / compat.json), with repeated operands moved into shared expressions
+    document = {key: value for key, value in document.items()}
+    document['channels'] = [dict(channel) for channel in document.get('channels', [])]
+    for channel in document['channels']:
+        for list_key in ['releases', 'compatNotices']:
+            if list_key in channel:
+                channel[list_key] = [dict(item) for item in channel[list_key]]
+    slots = list(_document_expression_slots(document))
+    original_expressions = [container[key] for container, key in slots]
+    shared_expressions, definitions = find_shared_subexpressions(original_expressions)
+    if not definitions:
+        # nothing worth sharing - keep the (inline) format
+        return document
+    for (container, key), expression in zip(slots, shared_expressions):
+        container[key] = expression
+    result = {'formatVersion': SHARED_EXPRESSIONS_FORMAT_VERSION, 'expressions': definitions}
+    result.update(document)
+    verify_shared_expressions(result, original_expressions)
+    return result
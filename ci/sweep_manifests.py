@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+#
+# Simulate the generated updates / compat / lobby documents over a range of time (with an injected clock),
+# and output only the change points - the times at which each document's content actually changes
+#
+# The release list is indexed once, and at each simulated time only the releases published by then are visible
+# (so a full release history can be swept, not just the current state). validThru is ignored when comparing,
+# and for the lobby document the releases whose netcode versions would be included are reported (instead of the
+# netcode versions themselves, which would require downloading the releases' source)
+
+import sys
+import argparse
+import bisect
+import json
+from datetime import datetime, timedelta, timezone
+
+from generate_updates_json import gen_updates_file, convert_github_json_date_to_datetime
+from generate_compat_json import gen_compat_file, DEFAULT_COMPAT_RULES_FILEPATH
+from compat_rules import load_compat_rules
+from generate_lobby_json import gen_lobby_file, get_allowed_prior_stable_releases, get_newer_prereleases
+
+class ReleaseIndex:
+    def __init__(self, releaselist: list):
+        # Draft releases are never visible
+        published = [release for release in releaselist if not release['draft'] and release.get('published_at')]
+        published.sort(key=lambda release: release['published_at'])
+        self.releases = published
+        self.published_times = [convert_github_json_date_to_datetime(release['published_at']) for release in published]
+        self.views = {}
+
+    def view(self, now: datetime):
+        # Returns: (latest stable release, release list as returned by the GitHub API) at the specified time
+        count = bisect.bisect_right(self.published_times, now)
+        if count not in self.views:
+            releaselist = list(reversed(self.releases[:count]))
+            latest = next((release for release in releaselist if not release['prerelease']), None)
+            self.views[count] = (latest, releaselist)
+        return self.views[count]
+
+    def first_release_time(self):
+        for release, published_time in zip(self.releases, self.published_times):
+            if not release['prerelease']:
+                return published_time
+        return None
+
+def without_valid_thru(document: dict) -> dict:
+    return {key: value for key, value in document.items() if key != 'validThru'}
+
+def gen_documents(latestrelease: dict, releaselist: list, latestdevcommit: dict, compatrules: list, now: datetime) -> dict:
+    # (the lookup table verification is run when the documents are generated for publishing - not at every simulated time)
+    lobby = gen_lobby_file(latestrelease, releaselist, latestdevcommit, [], now, verify=False)
+    del lobby['supportedNetcodeVerMajorMinor']
+    netcode_releases = get_allowed_prior_stable_releases(latestrelease, releaselist, now) + [latestrelease]
+    latest_prerelease = get_newer_prereleases(latestrelease, releaselist).latest_prerelease
+    if latest_prerelease:
+        netcode_releases.append(latest_prerelease)
+    lobby['netcodeReleases'] = [release['tag_name'] for release in netcode_releases]
+    return {
+        'wz2100.json': without_valid_thru(gen_updates_file(latestrelease, releaselist, latestdevcommit, now)),
+        'wz2100_compat.json': without_valid_thru(gen_compat_file(latestrelease, releaselist, latestdevcommit, compatrules, now)),
+        'wzlobby.json': lobby,
+    }
+
+def sweep(releaseindex: ReleaseIndex, latestdevcommit: dict, compatrules: list, start: datetime, end: datetime, step: timedelta):
+    # Yields: (time, document name, document) for each change point
+    previous = {}
+    now = start
+    while now <= end:
+        latestrelease, releaselist = releaseindex.view(now)
+        if not latestrelease is None:
+            documents = gen_documents(latestrelease, releaselist, latestdevcommit, compatrules, now)
+            for name, document in documents.items():
+                if previous.get(name) != document:
+                    previous[name] = document
+                    yield now, name, document
+        now += step
+
+def parse_sweep_time(time_string: str) -> datetime:
+    # Returns a naive (UTC) datetime - times with an offset (for example, GitHub's "Z" suffix) are converted to UTC
+    if time_string.endswith('Z'):
+        time_string = time_string[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(time_string)
+    if not parsed.tzinfo is None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Simulate the generated documents over a range of time, and output the change points')
+    parser.add_argument('-i', '--releaselist', type=str, required=True, help='list of (all) releases, as returned by the GitHub API')
+    parser.add_argument('-d', '--latestdevcommit', type=str, required=True)
+    parser.add_argument('-c', '--compatrules', type=str, default=DEFAULT_COMPAT_RULES_FILEPATH)
+    parser.add_argument('-s', '--start', type=parse_sweep_time, default=None, help='UTC start time (default: the first stable release)')
+    parser.add_argument('-e', '--end', type=parse_sweep_time, default=None, help='UTC end time (default: now)')
+    parser.add_argument('--step-hours', type=float, default=1.0)
+    parser.add_argument('-o', '--output', type=str, default=None, help='write the change points (including the documents) to this JSON file')
+    args = parser.parse_args(argv)
+
+    with open(args.releaselist, 'r') as releaselist_file, open(args.latestdevcommit, 'r') as devcommit_file:
+        releaseindex = ReleaseIndex(json.load(releaselist_file))
+        latestdevcommit = json.load(devcommit_file)
+    compatrules = load_compat_rules(args.compatrules)
+
+    start = args.start or releaseindex.first_release_time()
+    end = args.end or datetime.utcnow()
+    if start is None:
+        print('No stable release found')
+        sys.exit(1)
+    print ('Sweeping from {0} to {1} (every {2} hours)'.format(start.isoformat(), end.isoformat(), args.step_hours))
+
+    change_points = []
+    sweep_start = datetime.now()
+    for now, name, document in sweep(releaseindex, latestdevcommit, compatrules, start, end, timedelta(hours=args.step_hours)):
+        print('{0}  {1}'.format(now.isoformat(), name))
+        change_points.append({'time': now.isoformat(), 'document': name, 'content': document})
+    print ('{0} change points ({1:.2f}s)'.format(len(change_points), (datetime.now() - sweep_start).total_seconds()))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(change_points, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+   main(sys.argv[1:])